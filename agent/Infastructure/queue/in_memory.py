@@ -15,9 +15,13 @@ class InMemoryQueue(QueueInterface):
 
     Simple visibility timeout + requeue semantics are implemented so tests can
     exercise transient failures.
+
+    With ``requeue_check_interval=None`` no background thread is started;
+    expired jobs are requeued on demand at the start of each ``dequeue``
+    attempt instead.
     """
 
-    def __init__(self, visibility_timeout: float = 30.0, requeue_check_interval: float = 1.0):
+    def __init__(self, visibility_timeout: float = 30.0, requeue_check_interval: Optional[float] = 1.0):
         self._queues: Dict[str, deque] = {}
         self._locks: Dict[str, threading.Lock] = {}
         self._inflight: Dict[str, Dict[str, Any]] = {}
@@ -25,8 +29,10 @@ class InMemoryQueue(QueueInterface):
         self._stop = threading.Event()
         self._cond = threading.Condition()
         self._requeue_interval = requeue_check_interval
-        self._requeue_thread = threading.Thread(target=self._requeue_worker, daemon=True)
-        self._requeue_thread.start()
+        self._requeue_thread: Optional[threading.Thread] = None
+        if requeue_check_interval is not None:
+            self._requeue_thread = threading.Thread(target=self._requeue_worker, daemon=True)
+            self._requeue_thread.start()
 
     def _ensure_topic(self, topic: str):
         if topic not in self._queues:
@@ -46,16 +52,24 @@ class InMemoryQueue(QueueInterface):
     def dequeue(self, topic: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
         self._ensure_topic(topic)
         end = None if timeout is None else (time.time() + timeout)
+        on_demand = self._requeue_thread is None
         while True:
+            if on_demand:
+                self.run_requeue_once()
             with self._locks[topic]:
                 if self._queues[topic]:
                     job = self._queues[topic].popleft()
                     self._inflight[job["job_id"]] = {"job": job, "expire": time.time() + self._visibility_timeout}
                     return job
             with self._cond:
-                remaining = None if end is None else max(0, end - time.time())
+                now = time.time()
+                remaining = None if end is None else max(0, end - now)
                 if remaining == 0:
                     return None
+                if on_demand and self._inflight:
+                    # nothing else will wake us when a lease expires
+                    lease = max(0, min(info["expire"] for info in list(self._inflight.values())) - now)
+                    remaining = lease if remaining is None else min(remaining, lease)
                 self._cond.wait(timeout=remaining)
                 if end is not None and time.time() >= end:
                     return None
@@ -67,23 +81,37 @@ class InMemoryQueue(QueueInterface):
         topic = job.get("meta", {}).get("topic", "orchestrate")
         return self.enqueue(topic, job)
 
+    def run_requeue_once(self, now: Optional[float] = None) -> int:
+        """Requeue in-flight jobs whose visibility timeout expired by `now`.
+
+        One pass of the background requeue loop; tests can call it directly
+        (optionally with a future `now`) instead of sleeping past the timeout.
+        Returns the number of jobs requeued.
+        """
+        if now is None:
+            now = time.time()
+        expired = [jid for jid, info in list(self._inflight.items()) if info["expire"] <= now]
+        requeued = 0
+        for jid in expired:
+            info = self._inflight.pop(jid, None)
+            if info:
+                job = info["job"]
+                topic = job.get("meta", {}).get("topic", "orchestrate")
+                with self._locks.setdefault(topic, threading.Lock()):
+                    self._queues.setdefault(topic, deque()).append(job)
+                with self._cond:
+                    self._cond.notify_all()
+                requeued += 1
+        return requeued
+
     def _requeue_worker(self):
         while not self._stop.is_set():
-            now = time.time()
-            expired = [jid for jid, info in list(self._inflight.items()) if info["expire"] <= now]
-            for jid in expired:
-                info = self._inflight.pop(jid, None)
-                if info:
-                    job = info["job"]
-                    topic = job.get("meta", {}).get("topic", "orchestrate")
-                    with self._locks.setdefault(topic, threading.Lock()):
-                        self._queues.setdefault(topic, deque()).append(job)
-                    with self._cond:
-                        self._cond.notify_all()
+            self.run_requeue_once()
             time.sleep(self._requeue_interval)
 
     def stop(self):
         self._stop.set()
         with self._cond:
             self._cond.notify_all()
-        self._requeue_thread.join(timeout=1.0)
+        if self._requeue_thread is not None:
+            self._requeue_thread.join(timeout=1.0)
@@ -31,10 +31,15 @@ class Worker:
         self._stop = threading.Event()
         self._thread: Optional[threading.Thread] = None
 
-    def run_once(self, timeout: float = 1.0) -> None:
+    def run_once(self, timeout: float = 1.0) -> bool:
+        """Process at most one job, waiting up to `timeout` for it to arrive.
+
+        Returns True once a dequeued job has been acked and audited (success
+        or failure), False if nothing arrived within `timeout`.
+        """
         item = self.queue.dequeue(self.topic, timeout=timeout)
         if not item:
-            return
+            return False
         job_id = item.get("job_id")
         run_id = item.get("run_id")
         orchestrator_name = item.get("orchestrator")
@@ -69,6 +74,7 @@ class Worker:
             except Exception:
                 platform_monitoring.log_event("worker.audit.error", {"run_id": run_id, "error": traceback.format_exc()})
             platform_monitoring.log_event("worker.job.trace", {"job_id": job_id, "trace": traceback.format_exc()})
+        return True
 
     def start(self, poll_interval: float = 0.5):
         if self._thread and self._thread.is_alive():
@@ -11,12 +11,16 @@ Environment Override Precedence:
 * PERSIST_READ_TABLES   -> full explicit read allowlist (comma separated)
 
 This file is the single source of truth; services/agents must not hard‑code table lists.
+
+The getters return immutable tuples memoized per distinct env value, so repeated
+calls are O(1) while later env changes are still honored.
 """
 
 from __future__ import annotations
 
 import os
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
 
 # Enumerate all known tables (schema-derived + retained legacy 'inquiries')
 ALL_TABLES: List[str] = [
@@ -42,36 +46,45 @@ DEFAULT_WRITE_TABLES: List[str] = [t for t in ALL_TABLES if t not in DEFAULT_WRI
 # Reads now cover everything; keep empty list for legacy export compatibility
 DEFAULT_READ_ADDITIONS: List[str] = []
 
-def _env_list(var: str) -> List[str] | None:
-    raw = os.getenv(var)
+def _split_list(raw: str | None) -> List[str] | None:
     if not raw:
         return None
     return [p.strip() for p in raw.split(",") if p.strip()]
 
 
-def get_write_allowlist() -> List[str]:
+@lru_cache(maxsize=8)
+def _write_allowlist(explicit_raw: str | None, deny_raw: str | None) -> Tuple[str, ...]:
+    explicit = _split_list(explicit_raw)
+    if explicit:
+        return tuple(explicit)
+    deny_extra = set(_split_list(deny_raw) or [])
+    return tuple(t for t in DEFAULT_WRITE_TABLES if t not in deny_extra)
+
+
+@lru_cache(maxsize=8)
+def _read_allowlist(explicit_raw: str | None) -> Tuple[str, ...]:
+    explicit = _split_list(explicit_raw)
+    if explicit:
+        return tuple(explicit)
+    return tuple(ALL_TABLES)
+
+
+def get_write_allowlist() -> Tuple[str, ...]:
     """Return tables allowed for WRITE operations.
 
     Precedence:
       1. PERSIST_WRITE_TABLES (explicit full override)
       2. DEFAULT_WRITE_TABLES minus any PERSIST_WRITE_DENY entries
     """
-    explicit = _env_list("PERSIST_WRITE_TABLES")
-    if explicit:
-        return explicit
-    deny_extra = set(_env_list("PERSIST_WRITE_DENY") or [])
-    return [t for t in DEFAULT_WRITE_TABLES if t not in deny_extra]
+    return _write_allowlist(os.getenv("PERSIST_WRITE_TABLES"), os.getenv("PERSIST_WRITE_DENY"))
 
 
-def get_read_allowlist() -> List[str]:
+def get_read_allowlist() -> Tuple[str, ...]:
     """Return tables allowed for READ operations.
 
     Defaults to ALL_TABLES unless PERSIST_READ_TABLES is provided.
     """
-    explicit = _env_list("PERSIST_READ_TABLES")
-    if explicit:
-        return explicit
-    return list(ALL_TABLES)
+    return _read_allowlist(os.getenv("PERSIST_READ_TABLES"))
 
 
 __all__ = [
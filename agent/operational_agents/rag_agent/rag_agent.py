@@ -1,11 +1,14 @@
 from typing import Any, Optional
+import asyncio
 import re
 import json
 from datetime import datetime, timezone
 import hashlib
 import os
+import threading
 import time
 from collections import deque
+from functools import lru_cache
 import warnings
 
 # Prefer not to import heavy LLM/agent stacks during tests. We keep this module
@@ -39,6 +42,58 @@ class _CoordinatorStub:
         return {"status": "NOOP"}
 
 
+@lru_cache(maxsize=256)
+def _parse_filters_cached(text: str) -> tuple[tuple[str, str], ...]:
+    """Rule-based filter extraction behind RAGAgent.parse_filters_from_text.
+
+    Pure function of `text`, memoized so repeated prompts skip the regex pass.
+    Returns an immutable tuple of (key, value) pairs; callers build a fresh dict.
+    """
+    out = {}
+
+    # client_id: explicit phrase (prefer this over id when present)
+    m = re.search(r"client[_ ]?id\s*[:=]?\s*([0-9A-Za-z\-]{2,})\b", text, re.IGNORECASE)
+    if m:
+        out['client_id'] = m.group(1)
+
+    # id: 'id 123' or 'id: 123' or 'id = 123'
+    m = re.search(r"\bid\s*[:=]?\s*([0-9A-Za-z\-]{2,})\b", text, re.IGNORECASE)
+    if m:
+        out['id'] = m.group(1)
+
+    # explicit email address
+    m = re.search(r"([A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,})", text)
+    if m:
+        out['email'] = m.group(1)
+    else:
+        # patterns like 'email contains example.com' or 'email with example.com' or '@example.com'
+        m = re.search(r"email\s*(?:contains|with|like|that contains)?\s*[:\"]?([^\s,;']+\.[A-Za-z]{2,})", text, re.IGNORECASE)
+        if m:
+            v = m.group(1)
+            # turn domain-like into wildcard search
+            if '@' in v or '.' in v:
+                out['email'] = f"%{v}%"
+            else:
+                out['email'] = v
+        else:
+            m = re.search(r"@([A-Za-z0-9.\-]+\.[A-Za-z]{2,})", text)
+            if m:
+                out['email'] = f"%{m.group(1)}%"
+
+    # company: try phrases 'company X', 'from X', 'at X', 'works at X', 'of X'
+    m = re.search(r"(?:company|from|at|works at|of)\s+[\"']?([A-Z0-9][\w&.\- ]{1,60})[\"']?", text, re.IGNORECASE)
+    if m:
+        comp = m.group(1).strip()
+        out['company'] = comp
+
+    # Normalize wildcard markers '*' -> '%' for email/company if present
+    for k in ['email', 'company']:
+        if k in out and isinstance(out[k], str):
+            out[k] = out[k].replace('*', '%')
+
+    return tuple(out.items())
+
+
 class RAGAgent:
     """Retrieval Augmented Generation Agent (lean test‑friendly version).
 
@@ -60,6 +115,8 @@ class RAGAgent:
         # internal state for caching and mild rate limiting
         self._query_cache: dict[str, list[dict]] = {}
         self._fallback_timestamps: deque[float] = deque()
+        # guards the two structures above when tools run on executor threads
+        self._state_lock = threading.Lock()
 
         # Minimal tool representation to avoid importing LangChain's Tool
         class ToolLite:
@@ -71,9 +128,16 @@ class RAGAgent:
         self.tools = [
             ToolLite('query_leads', self.query_leads_tool),
             ToolLite('query_table', self.query_table_tool),
+            ToolLite('query_tables', self.query_tables_tool),
             ToolLite('rag_agent', self.rag_tool),
             ToolLite('deliver_data', self.deliver_data_disabled),
         ]
+        # name -> tool, so lookups don't rescan self.tools
+        self._tool_index = {t.name: t for t in self.tools}
+
+    def get_tool(self, name: str):
+        """Return the registered tool called `name` (KeyError if unknown)."""
+        return self._tool_index[name]
 
     # ------------------ Internal utility helpers ------------------
     def _stable_filter_key(self, table: str, filters: dict | None, limit: int | None, offset: int | None, order_by: str | None, descending: bool, select: list[str] | None) -> str:
@@ -91,13 +155,16 @@ class RAGAgent:
     def _maybe_cache_get(self, key: str):
         if not ENABLE_CACHE:
             return None
-        return self._query_cache.get(key)
+        with self._state_lock:
+            return self._query_cache.get(key)
 
     def _maybe_cache_set(self, key: str, rows: list[dict]):
         if not ENABLE_CACHE:
             return
         # shallow copy to avoid accidental mutation outside
-        self._query_cache[key] = [dict(r) for r in rows]
+        copied = [dict(r) for r in rows]
+        with self._state_lock:
+            self._query_cache[key] = copied
 
     def _debug_io(self, label: str, data: Any):  # pragma: no cover - debug instrumentation
         """Print structured debug info when RAG_DEBUG_IO env flag enabled.
@@ -169,14 +236,15 @@ class RAGAgent:
     def _rate_limit_fallback_allowed(self) -> bool:
         # purge timestamps older than 60 seconds
         now = time.time()
-        while self._fallback_timestamps and now - self._fallback_timestamps[0] > 60:
-            self._fallback_timestamps.popleft()
-        if MAX_FALLBACKS_PER_MIN <= 0:
-            return False
-        if len(self._fallback_timestamps) >= MAX_FALLBACKS_PER_MIN:
-            return False
-        self._fallback_timestamps.append(now)
-        return True
+        with self._state_lock:
+            while self._fallback_timestamps and now - self._fallback_timestamps[0] > 60:
+                self._fallback_timestamps.popleft()
+            if MAX_FALLBACKS_PER_MIN <= 0:
+                return False
+            if len(self._fallback_timestamps) >= MAX_FALLBACKS_PER_MIN:
+                return False
+            self._fallback_timestamps.append(now)
+            return True
 
     def _reformulation_attempts(self, original_filters: dict) -> list[dict]:
         """Generate a list of relaxed filter variants (does not include original)."""
@@ -379,6 +447,26 @@ class RAGAgent:
                     pass
             return fallback_env
 
+    async def query_leads_tool_async(self, args: dict):
+        """Awaitable `query_leads_tool`, run on the loop's default executor.
+
+        The query cache and fallback rate limiter are guarded by
+        ``_state_lock``, so several calls on one agent may be awaited together.
+        The persistence adapter must tolerate concurrent reads; InMemoryAdapter
+        is not thread-safe, so only gather over it while nothing writes to it.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.query_leads_tool, args)
+
+    @staticmethod
+    def _is_envelope(payload: Any) -> bool:
+        """True for a dict already shaped like an envelope (metadata dict + records list)."""
+        return (
+            isinstance(payload, dict)
+            and isinstance(payload.get('records'), list)
+            and isinstance(payload.get('metadata'), dict)
+        )
+
     def rag_tool(self, args: Any):
         """Tool wrapper so the RAGAgent can be called as a LangChain Tool.
 
@@ -389,9 +477,14 @@ class RAGAgent:
         Otherwise it coerces a prompt and calls `self.run(..., return_json=True)`.
         """
 
-        # Fast-path: if caller already provided records/envelope, return it directly
+        # Fast-path: a complete envelope dict is returned as-is (no copy/parse)
+        if self._is_envelope(args):
+            return args
+
+        # Only strings that look like a dict literal are worth parsing; plain
+        # prompts skip both json.loads and the ast fallback.
         payload = args
-        if isinstance(args, str):
+        if isinstance(args, str) and args.lstrip().startswith('{'):
             try:
                 parsed = json.loads(args)
             except Exception:
@@ -605,7 +698,7 @@ class RAGAgent:
 
         if filters:
             # call the leads tool directly for predictable behavior
-            tool = next(t for t in self.tools if t.name == 'query_leads')
+            tool = self.get_tool('query_leads')
             q_filters = self._normalize_filters(filters)
             self._deep("filters.normalized", q_filters)
             # If caller wants machine-readable output, return an envelope with provenance
@@ -812,49 +905,7 @@ class RAGAgent:
         if not text or not isinstance(text, str):
             return {}
 
-        out = {}
-
-        # client_id: explicit phrase (prefer this over id when present)
-        m = re.search(r"client[_ ]?id\s*[:=]?\s*([0-9A-Za-z\-]{2,})\b", text, re.IGNORECASE)
-        if m:
-            out['client_id'] = m.group(1)
-
-        # id: 'id 123' or 'id: 123' or 'id = 123'
-        m = re.search(r"\bid\s*[:=]?\s*([0-9A-Za-z\-]{2,})\b", text, re.IGNORECASE)
-        if m:
-            out['id'] = m.group(1)
-
-        # explicit email address
-        m = re.search(r"([A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,})", text)
-        if m:
-            out['email'] = m.group(1)
-        else:
-            # patterns like 'email contains example.com' or 'email with example.com' or '@example.com'
-            m = re.search(r"email\s*(?:contains|with|like|that contains)?\s*[:\"]?([^\s,;']+\.[A-Za-z]{2,})", text, re.IGNORECASE)
-            if m:
-                v = m.group(1)
-                # turn domain-like into wildcard search
-                if '@' in v or '.' in v:
-                    out['email'] = f"%{v}%"
-                else:
-                    out['email'] = v
-            else:
-                m = re.search(r"@([A-Za-z0-9.\-]+\.[A-Za-z]{2,})", text)
-                if m:
-                    out['email'] = f"%{m.group(1)}%"
-
-        # company: try phrases 'company X', 'from X', 'at X', 'works at X', 'of X'
-        m = re.search(r"(?:company|from|at|works at|of)\s+[\"']?([A-Z0-9][\w&.\- ]{1,60})[\"']?", text, re.IGNORECASE)
-        if m:
-            comp = m.group(1).strip()
-            out['company'] = comp
-
-        # Normalize wildcard markers '*' -> '%' for email/company if present
-        for k in ['email', 'company']:
-            if k in out and isinstance(out[k], str):
-                out[k] = out[k].replace('*', '%')
-
-        return out
+        return dict(_parse_filters_cached(text))
 
     def query_leads(self, id: str = None, email: str = None, company: str = None, select: str = '*'):
         """Convenience method to query the `leads` table directly from Python.
@@ -875,7 +926,7 @@ class RAGAgent:
         if company is not None:
             raw_filters['company'] = company
         # reuse the tool logic by calling the tool func directly
-        tool = next(t for t in self.tools if t.name == 'query_leads')
+        tool = self.get_tool('query_leads')
         return tool.func({'filters': raw_filters, 'select': select})
 
     def deliver_data_tool(self, args: dict):
@@ -916,18 +967,11 @@ class RAGAgent:
         """
         return {"status": "DISABLED", "reason": "delivery temporarily disabled"}
 
-    def query_table_tool(self, args: dict):
-        """Generic query tool for any allowed read table via persistence facade.
+    def _parse_tool_args(self, args: Any) -> tuple[dict | None, str | None]:
+        """Coerce tool input (dict, JSON string or Python-literal string) to a dict.
 
-        Args shape examples:
-        {"table": "clients", "filters": {"name": "Acme"}}
-        {"table": "campaigns"}  # no filters
-
-        Returns JSON envelope with metadata + records, or error metadata on failure.
+        Returns (args, None) on success or (None, error) when it is not a dict.
         """
-        if self._persistence is None:
-            return {"metadata": {"source": "persistence", "error": "persistence facade not injected"}, "records": []}
-        # tolerant parsing for string input
         if isinstance(args, str):
             try:
                 args = json.loads(args)
@@ -936,14 +980,13 @@ class RAGAgent:
                     import ast
                     args = ast.literal_eval(args)
                 except Exception:
-                    return {"metadata": {"source": "persistence", "error": "invalid args"}, "records": []}
+                    return None, "invalid args"
         if not isinstance(args, dict):
-            return {"metadata": {"source": "persistence", "error": "args must be dict"}, "records": []}
-        table = (args.get('table') or '').strip().lower()
-        filters = args.get('filters') if isinstance(args.get('filters'), dict) else None
-        now = datetime.now(timezone.utc).isoformat()
-        if not table:
-            return {"metadata": {"source": "persistence", "error": "missing table", "retrieved_at": now}, "records": []}
+            return None, "args must be dict"
+        return args, None
+
+    def _query_table_envelope(self, table: str, filters: dict | None, now: str) -> dict:
+        """Query one table through the facade; failures become error metadata."""
         try:
             rows = self._persistence.query(table, filters=filters or None)
             return {
@@ -967,6 +1010,73 @@ class RAGAgent:
                 'records': [],
             }
 
+    def query_table_tool(self, args: dict):
+        """Generic query tool for any allowed read table via persistence facade.
+
+        Args shape examples:
+        {"table": "clients", "filters": {"name": "Acme"}}
+        {"table": "campaigns"}  # no filters
+
+        Returns JSON envelope with metadata + records, or error metadata on failure.
+        """
+        if self._persistence is None:
+            return {"metadata": {"source": "persistence", "error": "persistence facade not injected"}, "records": []}
+        # tolerant parsing for string input
+        args, error = self._parse_tool_args(args)
+        if error:
+            return {"metadata": {"source": "persistence", "error": error}, "records": []}
+        table = (args.get('table') or '').strip().lower()
+        filters = args.get('filters') if isinstance(args.get('filters'), dict) else None
+        now = datetime.now(timezone.utc).isoformat()
+        if not table:
+            return {"metadata": {"source": "persistence", "error": "missing table", "retrieved_at": now}, "records": []}
+        return self._query_table_envelope(table, filters, now)
+
+    def query_tables_tool(self, args: dict):
+        """Query several tables in one tool call.
+
+        Args shape examples:
+        {"tables": ["leads", "messages"]}
+        {"tables": ["leads", "clients"], "filters": {"clients": {"name": "Acme"}}}  # per-table filters
+
+        Returns {"metadata": {...}, "tables": {table: envelope}} where each
+        envelope matches `query_table_tool` output (errors stay per table).
+        Table names and filter keys are matched case-insensitively; entries
+        that are not strings are skipped and listed in metadata.skipped.
+        """
+        if self._persistence is None:
+            return {"metadata": {"source": "persistence", "error": "persistence facade not injected"}, "tables": {}}
+        args, error = self._parse_tool_args(args)
+        if error:
+            return {"metadata": {"source": "persistence", "error": error}, "tables": {}}
+        tables = args.get('tables')
+        if not isinstance(tables, (list, tuple)) or not tables:
+            return {"metadata": {"source": "persistence", "error": "missing tables"}, "tables": {}}
+        raw_filters = args.get('filters') if isinstance(args.get('filters'), dict) else {}
+        # normalize filter keys exactly like table names below
+        per_table = {k.strip().lower(): v for k, v in raw_filters.items() if isinstance(k, str)}
+        # one timestamp for the whole batch
+        now = datetime.now(timezone.utc).isoformat()
+        results: dict[str, dict] = {}
+        skipped: list = []
+        for t in tables:
+            if not isinstance(t, str):
+                skipped.append(t)
+                continue
+            table = t.strip().lower()
+            if not table or table in results:
+                continue
+            filters = per_table.get(table)
+            results[table] = self._query_table_envelope(table, filters if isinstance(filters, dict) else None, now)
+        metadata = {
+            'source': 'persistence',
+            'retrieved_at': now,
+            'tables': list(results),
+            'total_count': sum(env['metadata']['total_count'] for env in results.values()),
+        }
+        if skipped:
+            metadata['skipped'] = skipped
+        return {'metadata': metadata, 'tables': results}
 
 # predictable symbol for runtime discovery
 AGENT_CLASS = RAGAgent
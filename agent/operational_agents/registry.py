@@ -10,17 +10,23 @@ Usage:
 """
 import importlib
 import pkgutil
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Dict, Any, Mapping
 
 PACKAGE = "agent.operational_agents"
 
 
-def discover_local_agents(package: str = PACKAGE) -> Dict[str, Any]:
+@lru_cache(maxsize=None)
+def discover_local_agents(package: str = PACKAGE) -> Mapping[str, Any]:
     """Discover local agent subpackages in a PEP-420-safe way.
 
     This iterates over all entries in package.__path__ so it works when the
     package is an explicit package (has __init__.py) or a namespace package.
+
+    The scan runs once per package per process; the result is a read-only
+    mapping. Call `discover_local_agents.cache_clear()` to rescan.
     """
     pkg = importlib.import_module(package)
     agents: Dict[str, Any] = {}
@@ -49,4 +55,4 @@ def discover_local_agents(package: str = PACKAGE) -> Dict[str, Any]:
                     agent_obj = None
             if agent_obj is not None:
                 agents[name] = agent_obj
-    return agents
+    return MappingProxyType(agents)
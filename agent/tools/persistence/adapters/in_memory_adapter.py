@@ -67,7 +67,19 @@ class InMemoryAdapter:
 		return stored
 
 	def batch_write(self, table: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-		return [self.write(table, r) for r in records]
+		"""Store all records with a single table append (same id rules as write)."""
+		self._ensure(table)
+		counter = self._counters[table]
+		stored_rows: List[Dict[str, Any]] = []
+		for record in records:
+			rid = record.get("id")
+			if rid is None:
+				rid = str(counter)
+				counter += 1
+			stored_rows.append({**record, "id": rid})
+		self._counters[table] = counter
+		self._tables[table].extend(stored_rows)
+		return stored_rows
 
 	def upsert(
 		self, table: str, record: Dict[str, Any], on_conflict: Optional[List[str]] = None
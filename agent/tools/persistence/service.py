@@ -1,4 +1,4 @@
-from typing import Any, Dict, List, Optional, Protocol, Callable
+from typing import Any, Dict, List, Mapping, Optional, Protocol, Callable, Sequence
 import os, time
 from .exceptions import (
     # PersistenceError,  # unused
@@ -77,21 +77,22 @@ class PersistenceService:
             if self.read_allowlist and tbl not in self.read_allowlist:
                 raise TableNotAllowedError(f"Read access to table '{table}' is not permitted by policy")
 
-    def _clean(self, record: Dict[str, Any]) -> Dict[str, Any]:
+    def _clean(self, record: Mapping[str, Any]) -> Dict[str, Any]:
+        # always builds a new dict, so read-only mappings (e.g. MappingProxyType) are fine
         return {k: v for k, v in record.items() if v is not None}
 
     # -------- write APIs --------
-    def write(self, table: str, record: Dict[str, Any]) -> Dict[str, Any]:
+    def write(self, table: str, record: Mapping[str, Any]) -> Dict[str, Any]:
         self._check_table(table, write=True)
         return self._invoke("write", table, lambda: self.adapter.write(table, self._clean(record)))
 
-    def batch_write(self, table: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def batch_write(self, table: str, records: Sequence[Mapping[str, Any]]) -> List[Dict[str, Any]]:
         self._check_table(table, write=True)
         cleaned = [self._clean(r) for r in records]
         return self._invoke("batch_write", table, lambda: self.adapter.batch_write(table, cleaned))
 
     def upsert(
-        self, table: str, record: Dict[str, Any], on_conflict: Optional[List[str]] = None
+        self, table: str, record: Mapping[str, Any], on_conflict: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         self._check_table(table, write=True)
         return self._invoke(
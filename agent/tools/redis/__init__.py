@@ -2,7 +2,8 @@
 
 Modules
 -------
-- client: RedisPubSub wrapper (URL or host/port envs, namespaced channels)
+- client: RedisPubSub wrapper (URL or host/port envs, namespaced channels) and
+  get_client() for a shared per-process instance
 - messages: QueryTask / QueryResponse dataclasses
 
 Intended use
@@ -11,4 +12,4 @@ Intended use
 - RAG workers subscribe to requests and publish responses after executing.
 """
 
-from .client import RedisPubSub  # noqa: F401
+from .client import RedisPubSub, get_client  # noqa: F401
@@ -10,9 +10,11 @@ Environment variables supported:
 """
 from __future__ import annotations
 
+import copy
 import json
 import os
-from typing import Any, Callable, Dict, Optional, List, Tuple
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, List, Tuple
 import time
 
 try:
@@ -25,7 +27,8 @@ class RedisPubSub:
 	"""Lightweight Redis pub/sub wrapper.
 
 	If REDIS_URL is set, it is preferred (handles TLS via rediss://). Otherwise,
-	falls back to host/port/db/password envs.
+	falls back to host/port/db/password envs. Pass ``decode_responses=False`` to
+	get raw bytes back from reads (hot paths that parse payloads themselves).
 	"""
 
 	def __init__(
@@ -36,6 +39,7 @@ class RedisPubSub:
 		db: Optional[int] = None,
 		password: Optional[str] = None,
 		namespace: Optional[str] = None,
+		decode_responses: bool = True,
 	):
 		if redis is None:
 			raise ImportError("Please 'pip install redis' to use RedisPubSub")
@@ -43,14 +47,14 @@ class RedisPubSub:
 		self.ns = namespace or os.getenv("REDIS_NAMESPACE", "agentic")
 		url = url or os.getenv("REDIS_URL")
 		if url:
-			self.client = redis.from_url(url, decode_responses=True)
+			self.client = redis.from_url(url, decode_responses=decode_responses)
 		else:
 			self.client = redis.Redis(
 				host=host or os.getenv("REDIS_HOST", "localhost"),
 				port=int(port or os.getenv("REDIS_PORT", "6379")),
 				db=int(db or os.getenv("REDIS_DB", "0")),
 				password=password or os.getenv("REDIS_PASSWORD"),
-				decode_responses=True,
+				decode_responses=decode_responses,
 			)
 		self.pubsub = self.client.pubsub()
 
@@ -81,12 +85,46 @@ class RedisPubSub:
 	# Streams (XADD / XREAD / XREADGROUP / XACK)
 	# -------------------------
 
-	def xadd(self, stream: str, fields: Dict[str, Any], maxlen: Optional[int] = None) -> str:
-		"""Add an entry to a stream. Returns message ID."""
+	def xadd(
+		self,
+		stream: str,
+		fields: Dict[str, Any],
+		maxlen: Optional[int] = None,
+		approximate: bool = True,
+	) -> str:
+		"""Add an entry to a stream. Returns message ID.
+
+		When ``maxlen`` is set the stream is trimmed with ``MAXLEN ~`` by default,
+		which keeps XADD cheap; pass ``approximate=False`` for an exact trim.
+		"""
 		stream_name = self._chan(stream)
 		# Ensure all values are strings
 		payload = {k: json.dumps(v, default=str) if not isinstance(v, str) else v for k, v in fields.items()}
-		return self.client.xadd(stream_name, payload, maxlen=maxlen)
+		return self.client.xadd(stream_name, payload, maxlen=maxlen, approximate=approximate)
+
+	def pipeline(self, transaction: bool = False):
+		"""Return a redis-py pipeline bound to this client's connection pool.
+
+		Commands are buffered and sent in one round-trip on ``execute()``. Keys are
+		passed through as-is, so wrap stream/channel names with ``_chan()``.
+		"""
+		return self.client.pipeline(transaction=transaction)
+
+	@contextmanager
+	def dedicated_connection(self) -> Iterator["RedisPubSub"]:
+		"""Yield a RedisPubSub view pinned to one connection from this client's pool.
+
+		Every command on the view reuses the same socket instead of checking a
+		connection out of the pool per call. Use one view per thread; the
+		connection is returned to the pool on exit.
+		"""
+		view = copy.copy(self)
+		view.client = redis.Redis(connection_pool=self.client.connection_pool, single_connection_client=True)
+		view.pubsub = view.client.pubsub()
+		try:
+			yield view
+		finally:
+			view.close()
 
 	def xread(
 		self,
@@ -204,4 +242,20 @@ class RedisPubSub:
 			pass
 
 
-__all__ = ["RedisPubSub"]
+_client: Optional[RedisPubSub] = None
+
+
+def get_client() -> RedisPubSub:
+	"""Return a process-wide RedisPubSub built from env on first use.
+
+	Short-lived admin scripts call this from several helpers; sharing one
+	instance means one TCP/TLS handshake + AUTH per process instead of one
+	per helper.
+	"""
+	global _client
+	if _client is None:
+		_client = RedisPubSub()
+	return _client
+
+
+__all__ = ["RedisPubSub", "get_client"]
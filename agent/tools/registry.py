@@ -5,17 +5,23 @@ expose `TOOL` or `create_tool` to be discovered.
 """
 import importlib
 import pkgutil
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Dict, Any, Mapping
 
 PACKAGE = "agent.tools"
 
 
-def discover_local_tools(package: str = PACKAGE) -> Dict[str, Any]:
+@lru_cache(maxsize=None)
+def discover_local_tools(package: str = PACKAGE) -> Mapping[str, Any]:
     """Discover local tool modules in a PEP-420-safe way.
 
     Iterates over entries in package.__path__ so it works with namespace
     packages as well as normal packages with __init__.py.
+
+    The scan runs once per package per process; the result is a read-only
+    mapping. Call `discover_local_tools.cache_clear()` to rescan.
     """
     pkg = importlib.import_module(package)
     tools: Dict[str, Any] = {}
@@ -33,4 +39,4 @@ def discover_local_tools(package: str = PACKAGE) -> Dict[str, Any]:
             tool_obj = getattr(mod, "TOOL", None) or getattr(mod, "create_tool", None)
             if tool_obj is not None:
                 tools[name] = tool_obj
-    return tools
+    return MappingProxyType(tools)
@@ -7,7 +7,7 @@ from __future__ import annotations
 
 import random
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 
 
 DEFAULT_CLIENT_IDS: List[str] = [
@@ -136,17 +136,32 @@ def generate_lead_profile(
     return profile
 
 
+def iter_leads(
+    count: int,
+    client_ids: Optional[List[str]] = None,
+    campaign_id: str = DEFAULT_CAMPAIGN_ID,
+) -> Iterator[Dict]:
+    """Yield `count` (at least 1) mock lead profiles one at a time.
+
+    Lazy counterpart of generate_leads() for large batches that are streamed
+    straight into a queue, so the whole batch never sits in memory.
+    """
+    for _ in range(max(1, int(count))):
+        yield generate_lead_profile(client_ids=client_ids, campaign_id=campaign_id)
+
+
 def generate_leads(
     count: int,
     client_ids: Optional[List[str]] = None,
     campaign_id: str = DEFAULT_CAMPAIGN_ID,
 ) -> List[Dict]:
-    return [generate_lead_profile(client_ids=client_ids, campaign_id=campaign_id) for _ in range(max(1, int(count)))]
+    return list(iter_leads(count, client_ids=client_ids, campaign_id=campaign_id))
 
 
 __all__ = [
     "generate_lead_profile",
     "generate_leads",
+    "iter_leads",
     "DEFAULT_CLIENT_IDS",
     "DEFAULT_CAMPAIGN_ID",
 ]
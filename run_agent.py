@@ -52,7 +52,7 @@ else:
 	if args.filters:
 		filters = json.loads(args.filters)
 		# call tool directly
-		tool = next(t for t in agent.tools if t.name == 'query_leads')
+		tool = agent.get_tool('query_leads')
 		print(tool.func({'filters': filters, 'select': args.select}))
 	else:
 		print(agent.query_leads(id=args.id, email=args.email, company=args.company, select=args.select))
@@ -28,8 +28,7 @@ def build_facade() -> ReadOnlyPersistenceFacade | None:
         ]
         mem = InMemoryAdapter()
         service = PersistenceService(adapter=mem, allowed_tables=["leads"])  # legacy single allowlist
-        for row in sample_rows:
-            service.write("leads", row)
+        service.batch_write("leads", sample_rows)
         return ReadOnlyPersistenceFacade(service)
     except Exception:
         return None
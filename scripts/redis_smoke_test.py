@@ -10,33 +10,33 @@ print('redis-py version:', redis.__version__)
 print('OpenSSL:', _ssl.OPENSSL_VERSION)
 print('REDIS_URL:', url)
 
-def try_connect(u, **kwargs):
-    try:
-        r = redis.from_url(u, decode_responses=True, **kwargs)
-        return r.ping()
-    except Exception as e:
-        print('Connect failed:', type(e).__name__, e)
-        return None
-
-print('\nTrying from_url as-is...')
-print('PING:', try_connect(url))
-
 parsed = urlparse(url)
 host = parsed.hostname
 port = parsed.port
 user = parsed.username
 pwd = parsed.password
 
-print('\nTrying explicit TLS...')
-try:
-    r = redis.Redis(host=host, port=port, username=user, password=pwd, ssl=True)
-    print('PING (ssl=True):', r.ping())
-except Exception as e:
-    print('TLS explicit failed:', type(e).__name__, e)
+# Tried in order; stop at the first one that answers PING and keep its connection.
+attempts = [
+    ('from_url as-is', lambda: redis.from_url(url, decode_responses=True)),
+    ('explicit TLS', lambda: redis.Redis(host=host, port=port, username=user, password=pwd, ssl=True)),
+    ('explicit non-TLS', lambda: redis.Redis(host=host, port=port, username=user, password=pwd, ssl=False)),
+]
+
+r = None
+for label, connect in attempts:
+    print(f'\nTrying {label}...')
+    try:
+        candidate = connect()
+        if candidate.ping():
+            print('PING ok via', label)
+            r = candidate
+            break
+        candidate.close()
+    except Exception as e:
+        print(f'{label} failed:', type(e).__name__, e)
 
-print('\nTrying explicit non-TLS...')
-try:
-    r = redis.Redis(host=host, port=port, username=user, password=pwd, ssl=False)
-    print('PING (ssl=False):', r.ping())
-except Exception as e:
-    print('Non-TLS explicit failed:', type(e).__name__, e)
+if r is None:
+    print('\nNo connection attempt succeeded.')
+else:
+    r.close()
@@ -5,7 +5,8 @@ Usage:
   python scripts/redis_stream_smoke.py --consume --once
 
 Respects env:
-  REDIS_URL, REDIS_NAMESPACE, REDIS_STREAM_TASKS, REDIS_STREAM_RESULTS, REDIS_GROUP, REDIS_CONSUMER
+  REDIS_URL, REDIS_NAMESPACE, REDIS_STREAM_TASKS, REDIS_STREAM_RESULTS, REDIS_GROUP, REDIS_CONSUMER,
+  STREAM_MAXLEN (approximate trim for produce, default 10000; 0 disables)
 """
 from __future__ import annotations
 
@@ -25,20 +26,45 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from agent.tools.redis.client import RedisPubSub
+from agent.tools.redis.client import get_client
 from agent.tools.redis import config as rconf
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # stdlib fallback
+    orjson = None  # type: ignore
+
+
+def _dumps(obj) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj).decode()
+    return json.dumps(obj)
+
+
+def _loads(raw):
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _emit(obj) -> None:
+    """Write one JSON line to stdout (through the text wrapper, so it stays ordered with print())."""
+    sys.stdout.write(_dumps(obj) + "\n")
+    sys.stdout.flush()
+
 
 def produce() -> None:
-    r = RedisPubSub()
+    r = get_client()
     payload = {"hello": "world", "pid": os.getpid()}
-    mid = r.xadd(rconf.STREAM_TASKS, {"data": json.dumps(payload)}, maxlen=int(os.getenv("STREAM_MAXLEN", "0") or 0) or None)
-    print(json.dumps({"enqueued": True, "message_id": mid, "stream": rconf.full_key(rconf.STREAM_TASKS)}))
+    # Bounded by default (MAXLEN ~10000); STREAM_MAXLEN=0 disables trimming
+    maxlen = int(os.getenv("STREAM_MAXLEN", "10000") or 0) or None
+    mid = r.xadd(rconf.STREAM_TASKS, {"data": _dumps(payload)}, maxlen=maxlen, approximate=True)
+    _emit({"enqueued": True, "message_id": mid, "stream": rconf.full_key(rconf.STREAM_TASKS)})
     r.close()
 
 
 def consume(once: bool = False) -> None:
-    r = RedisPubSub()
+    r = get_client()
     consumer = os.getenv("REDIS_CONSUMER") or f"smoke-{os.getpid()}"
     r.xgroup_create(rconf.STREAM_TASKS, rconf.GROUP_WORKERS, id="$", mkstream=True)
     print(f"listening on {rconf.full_key(rconf.STREAM_TASKS)} as {consumer} in group {rconf.GROUP_WORKERS}")
@@ -47,10 +73,10 @@ def consume(once: bool = False) -> None:
         for _stream, entries in (batches or []):
             for mid, fields in entries:
                 try:
-                    data = json.loads(fields.get("data", "{}"))
+                    data = _loads(fields.get("data") or "{}")
                 except Exception:
                     data = {"raw": fields.get("data")}
-                print(json.dumps({"got": True, "message_id": mid, "data": data}))
+                _emit({"got": True, "message_id": mid, "data": data})
                 r.xack(rconf.STREAM_TASKS, rconf.GROUP_WORKERS, mid)
                 if once:
                     r.close()
@@ -9,10 +9,14 @@ Usage (PowerShell):
   $env:USE_REAL_TESTS=1; python scripts/run_live_queries.py
 
 This demo now constructs the agent via the factory to guarantee a read-only
-persistence façade is wired in (no writes possible from this flow).
+persistence façade is wired in (no writes possible from this flow). Prompts
+are issued concurrently from a small thread pool, one agent per thread, and
+each result is printed as soon as it is ready (completion order).
 """
 import json
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 # ensure repo root is on sys.path
@@ -37,12 +41,30 @@ queries = [
     "Find leads at company 'Acme'"
 ]
 
-agent = create_rag_agent(kind='supabase')
+# Queries are network-bound (Supabase/OpenAI round-trips), so they are issued
+# concurrently. RAGAgent mutates per-instance state (fallback rate limiter,
+# query cache), so each worker thread gets its own agent.
+_local = threading.local()
 
-for q in queries:
-    print("\n--- Prompt:\n", q)
-    try:
-        res = agent.run(q, return_json=True, include_raw=False)
-        print(json.dumps(res, ensure_ascii=False, indent=2))
-    except Exception as e:
-        print("Error running prompt:", e)
+
+def _agent():
+    agent = getattr(_local, "agent", None)
+    if agent is None:
+        agent = _local.agent = create_rag_agent(kind='supabase')
+    return agent
+
+
+def _run(q):
+    return _agent().run(q, return_json=True, include_raw=False)
+
+
+with ThreadPoolExecutor(max_workers=6) as ex:
+    futures = {ex.submit(_run, q): q for q in queries}
+    for fut in as_completed(futures):
+        q = futures[fut]
+        print("\n--- Prompt:\n", q)
+        try:
+            res = fut.result()
+            print(json.dumps(res, ensure_ascii=False, indent=2))
+        except Exception as e:
+            print("Error running prompt:", e)
@@ -1,6 +1,8 @@
+import bisect
 import re
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 PATTERNS = [
@@ -11,38 +13,103 @@ PATTERNS = [
     re.compile(r"-----BEGIN (?:RSA|EC|OPENSSH|PGP) PRIVATE KEY-----"),
 ]
 
+
+def _combine(patterns) -> "re.Pattern[str]":
+    """Fold PATTERNS into one alternation so clean files are rejected in a single pass.
+
+    finditer on an alternation keeps only the first alternative matching at each
+    span, so overlapping hits from other patterns would be lost; scan_one only
+    uses it as a prefilter and reports hits per pattern.
+
+    Leading inline flags such as ``(?i)`` are only legal at the start of a whole
+    expression, so they are rewritten as scoped groups (``(?i:...)``) to keep each
+    pattern's case sensitivity intact inside the alternation.
+    """
+    alts = []
+    for i, pat in enumerate(patterns):
+        src = pat.pattern
+        if src.startswith("(?i)"):
+            src = src[len("(?i)"):]
+        scope = "i" if pat.flags & re.IGNORECASE else ""
+        alts.append(f"(?P<p{i}>(?{scope}:{src}))")
+    return re.compile("|".join(alts))
+
+
+COMBINED = _combine(PATTERNS)
+_NEWLINE = re.compile("\n")
+
 EXCLUDE_DIRS = {".git", ".venv", "__pycache__", "node_modules", ".mypy_cache", ".pytest_cache"}
 EXCLUDE_FILES = {"secret_scan.py"}
 EXCLUDE_PATH_SUBSTRINGS = {os.path.join('config', 'settings.py')}
 
+# Only the first MAX_SCAN_BYTES of each file are scanned; a NUL byte within the
+# first BINARY_PROBE_BYTES marks the file as binary and skips it entirely.
+MAX_SCAN_BYTES = 1 << 20
+BINARY_PROBE_BYTES = 4096
+
 
-def should_skip(path: Path) -> bool:
-    parts = set(path.parts)
-    if parts & EXCLUDE_DIRS:
-        return True
-    if path.name in EXCLUDE_FILES:
-        return True
+def should_skip(path: str) -> bool:
+    """Leaf check for a single file path yielded by walk().
+
+    Excluded directories and file names are already filtered by walk() using the
+    DirEntry name, so only the path-substring exclusions remain here.
+    """
+    for sub in EXCLUDE_PATH_SUBSTRINGS:
+        if sub in path:
+            return True
     return False
 
 
+def walk(d: str):
+    """Yield file paths under d, never descending into EXCLUDE_DIRS or yielding EXCLUDE_FILES."""
+    with os.scandir(d) as it:
+        for e in it:
+            if e.is_dir(follow_symlinks=False):
+                if e.name in EXCLUDE_DIRS:
+                    continue
+                yield from walk(e.path)
+            elif e.name not in EXCLUDE_FILES:
+                yield e.path
+
+
+def scan_one(p: str) -> list:
+    """Read a single file and return its (path, line, snippet) hits."""
+    try:
+        with open(p, "rb") as f:
+            head = f.read(MAX_SCAN_BYTES)
+    except Exception:
+        return []
+    if b"\x00" in head[:BINARY_PROBE_BYTES]:
+        return []
+    text = head.decode("utf-8", "ignore")
+    # Most files are clean: one combined pass decides that
+    if COMBINED.search(text) is None:
+        return []
+    # File has a hit: rescan per pattern so overlapping hits are all reported
+    hits = []
+    newlines = [nl.start() for nl in _NEWLINE.finditer(text)]
+    for pat in PATTERNS:
+        for m in pat.finditer(text):
+            line_no = bisect.bisect_right(newlines, m.start()) + 1
+            snippet = text[m.start(): m.start()+80].replace("\n", " ")
+            hits.append((p, line_no, snippet))
+    return hits
+
+
 def main() -> int:
     root = Path(__file__).resolve().parents[1]
-    hits = []
-    for p in root.rglob("*"):
-        if p.is_dir() or should_skip(p):
-            continue
-        try:
-            text = p.read_text(errors="ignore")
-        except Exception:
-            continue
+    # Cheap directory walk first; all exclusion filters run here so excluded
+    # files are never shipped to a worker process.
+    paths = []
+    for p in walk(str(root)):
         # Skip known files that contain env var names for documentation/config purposes
-        if any(sub in str(p) for sub in EXCLUDE_PATH_SUBSTRINGS):
+        if should_skip(p):
             continue
-        for pat in PATTERNS:
-            for m in pat.finditer(text):
-                line_no = text.count("\n", 0, m.start()) + 1
-                snippet = text[m.start(): m.start()+80].replace("\n", " ")
-                hits.append((p, line_no, snippet))
+        paths.append(p)
+    hits = []
+    with ProcessPoolExecutor() as ex:
+        for file_hits in ex.map(scan_one, paths, chunksize=64):
+            hits.extend(file_hits)
     if hits:
         print("SECRET SCAN FOUND POTENTIAL SECRETS:\n")
         for p, ln, snip in hits:
@@ -46,7 +46,7 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from agent.tools.redis.client import RedisPubSub
+from agent.tools.redis.client import get_client
 from agent.tools.redis import config as rconf
 
 
@@ -95,7 +95,7 @@ def main() -> None:
     ap.add_argument("--yes", action="store_true", help="Skip interactive confirmation")
     args = ap.parse_args()
 
-    r = RedisPubSub()
+    r = get_client()
     client = r.client
 
     plan = []
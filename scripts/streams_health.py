@@ -19,10 +19,13 @@ Usage (PowerShell):
 Options:
   --section rag|persist|both     Which set of streams to inspect (default both)
   --verbose                      Print full raw structures in addition to summary
+  --pattern GLOB                 Heartbeat key pattern to SCAN (default ops:hb:*)
 """
 from __future__ import annotations
 
 import argparse
+import contextlib
+import io
 import json
 import os
 import sys
@@ -38,14 +41,45 @@ ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from agent.tools.redis.client import RedisPubSub
+from agent.tools.redis.client import RedisPubSub, get_client
 from agent.tools.redis import config as rconf
 
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # stdlib fallback
+    orjson = None  # type: ignore
+
+# Verbose dumps replace any single str/bytes value longer than this with a size marker.
+MAX_FIELD_BYTES = 4096
+
+
+def _cap(data):
+    """Return a copy of data with oversized str/bytes leaves replaced by "<n bytes>"."""
+    if isinstance(data, dict):
+        return {
+            k.decode("utf-8", "replace") if isinstance(k, bytes) else str(k): _cap(v)
+            for k, v in data.items()
+        }
+    if isinstance(data, (list, tuple)):
+        return [_cap(v) for v in data]
+    if isinstance(data, bytes):
+        if len(data) > MAX_FIELD_BYTES:
+            return f"<{len(data)} bytes>"
+        return data.decode("utf-8", "replace")
+    if isinstance(data, str) and len(data) > MAX_FIELD_BYTES:
+        return f"<{len(data.encode('utf-8'))} bytes>"
+    return data
+
+
 def _safe_print(title: str, data) -> None:
     print(title)
     try:
-        print(json.dumps(data, indent=2))
+        capped = _cap(data)
+        if orjson is not None:
+            print(orjson.dumps(capped, option=orjson.OPT_INDENT_2, default=str).decode())
+        else:
+            print(json.dumps(capped, indent=2, default=str))
     except Exception:
         print(str(data))
 
@@ -89,7 +123,9 @@ def inspect_stream(client, stream_short: str, group: str | None, verbose: bool =
         print(f"xinfo_stream error: {e}")
         return
 
-    # Groups
+    # Groups. Redis 7+ reports lag/entries-read here directly; lag is None when
+    # it cannot be computed (e.g. after deletions), so XPENDING stays as fallback.
+    lag_known = set()
     try:
         ginfo = client.xinfo_groups(stream_key)
         if not ginfo:
@@ -97,9 +133,14 @@ def inspect_stream(client, stream_short: str, group: str | None, verbose: bool =
         else:
             print("groups:")
             for g in ginfo:
-                print(
+                line = (
                     f"  - name={g.get('name')} consumers={g.get('consumers')} pending={g.get('pending')} last-delivered-id={g.get('last-delivered-id')}"
                 )
+                lag, entries_read = g.get("lag"), g.get("entries-read")
+                if lag is not None and entries_read is not None:
+                    line += f" lag={lag} entries-read={entries_read}"
+                    lag_known.add(g.get("name"))
+                print(line)
             if verbose:
                 _safe_print("xinfo_groups:", ginfo)
     except Exception as e:
@@ -124,24 +165,30 @@ def inspect_stream(client, stream_short: str, group: str | None, verbose: bool =
         except Exception as e:
             print(f"xinfo_consumers ({grp}) error: {e}")
 
-        # XPENDING summary
+        # XPENDING summary, only when XINFO GROUPS could not report lag
+        if grp in lag_known:
+            continue
         xp = _xpending_summary(client, stream_key, grp)
         if xp:
             print(f"xpending ({grp}):", json.dumps(xp, indent=2))
 
 
-def inspect_heartbeats(r: RedisPubSub, verbose: bool = False, sample: int = 20) -> None:
+def inspect_heartbeats(
+    r: RedisPubSub, verbose: bool = False, sample: int = 20, pattern: str = "ops:hb:*"
+) -> None:
     """List heartbeat keys (ops:hb:*) with TTLs and summarize by service.
 
-    Uses SCAN to avoid KEYS. Shows up to `sample` entries with TTL values.
+    Uses SCAN to avoid KEYS; the match and the string TYPE filter run server-side
+    with a large COUNT to keep round-trips low. Shows up to `sample` entries with
+    TTL values, fetched in one pipeline.
     """
-    pattern = r._chan("ops:hb:*")  # namespaced pattern
+    pattern = r._chan(pattern)  # namespaced pattern
     client = r.client
     total = 0
     per_service = {}
-    samples = []
+    sample_keys = []
     try:
-        for key in client.scan_iter(match=pattern, count=500):
+        for key in client.scan_iter(match=pattern, count=5000, _type="string"):
             total += 1
             try:
                 # derive service from key ns:ops:hb:{service}:{id}
@@ -156,15 +203,25 @@ def inspect_heartbeats(r: RedisPubSub, verbose: bool = False, sample: int = 20)
                     # fallback: try second to last as service
                     svc = parts[-2]
                 per_service[svc or "unknown"] = per_service.get(svc or "unknown", 0) + 1
-                if len(samples) < sample:
-                    ttl = client.ttl(key)
-                    samples.append({"key": key, "ttl": ttl})
+                if len(sample_keys) < sample:
+                    sample_keys.append(key)
             except Exception:
                 pass
     except Exception as e:
         print(f"\n=== Heartbeats (ops:hb) ===\nerror scanning heartbeats: {e}")
         return
 
+    samples = []
+    if sample_keys:
+        try:
+            pipe = client.pipeline(transaction=False)
+            for key in sample_keys:
+                pipe.ttl(key)
+            ttls = pipe.execute()
+        except Exception:
+            ttls = [None] * len(sample_keys)
+        samples = [{"key": k, "ttl": t} for k, t in zip(sample_keys, ttls)]
+
     print("\n=== Heartbeats (ops:hb) ===")
     print(f"total: {total}")
     if per_service:
@@ -179,6 +236,25 @@ def inspect_heartbeats(r: RedisPubSub, verbose: bool = False, sample: int = 20)
         _safe_print("sample_raw:", samples)
 
 
+# (short stream name, label) for every stream the overview knows about; the
+# namespaced keys are resolved once per run via _resolve().
+_KNOWN_STREAMS = (
+    (rconf.STREAM_TASKS, "rag:tasks"),
+    (rconf.STREAM_RESULTS, "rag:results"),
+    (getattr(rconf, "STREAM_DLQ", "rag:dlq"), "rag:dlq"),
+    (rconf.STREAM_TASKS_WRITE, "persist:tasks"),
+    (rconf.STREAM_RESULTS_WRITE, "persist:results"),
+    (getattr(rconf, "STREAM_DLQ_WRITE", "persist:dlq"), "persist:dlq"),
+)
+_DLQ_LABELS = ("rag:dlq", "persist:dlq")
+
+
+def _resolve(shorts=_KNOWN_STREAMS) -> list[tuple[str, str]]:
+    """Return (full_key, label) pairs for the given (short, label) pairs."""
+    full_key = rconf.full_key
+    return [(full_key(short), label) for short, label in shorts]
+
+
 def _xinfo_len(client, stream_key: str) -> int | None:
     try:
         info = client.xinfo_stream(stream_key)
@@ -187,28 +263,23 @@ def _xinfo_len(client, stream_key: str) -> int | None:
         return None
 
 
-def overview_known_streams(client) -> None:
+def overview_known_streams(client, pairs: list[tuple[str, str]] | None = None) -> None:
     """Print a compact overview of known streams and their lengths."""
-    pairs = [
-        (rconf.full_key(rconf.STREAM_TASKS), "rag:tasks"),
-        (rconf.full_key(rconf.STREAM_RESULTS), "rag:results"),
-        (rconf.full_key(getattr(rconf, "STREAM_DLQ", "rag:dlq")), "rag:dlq"),
-        (rconf.full_key(rconf.STREAM_TASKS_WRITE), "persist:tasks"),
-        (rconf.full_key(rconf.STREAM_RESULTS_WRITE), "persist:results"),
-        (rconf.full_key(getattr(rconf, "STREAM_DLQ_WRITE", "persist:dlq")), "persist:dlq"),
-    ]
+    if pairs is None:
+        pairs = _resolve()
     print("\n=== Overview (lengths) ===")
     for key, label in pairs:
         ln = _xinfo_len(client, key)
         print(f"{label:<16} {key} length={ln if ln is not None else 'n/a'}")
 
 
-def inspect_dlq(client, verbose: bool = False, sample: int = 3) -> None:
+def inspect_dlq(
+    client, verbose: bool = False, sample: int = 3, pairs: list[tuple[str, str]] | None = None
+) -> None:
     """Display DLQ stream lengths and up to `sample` entries for each."""
-    dlqs = [
-        (rconf.full_key(getattr(rconf, "STREAM_DLQ", "rag:dlq")), "rag:dlq"),
-        (rconf.full_key(getattr(rconf, "STREAM_DLQ_WRITE", "persist:dlq")), "persist:dlq"),
-    ]
+    if pairs is None:
+        pairs = _resolve()
+    dlqs = [(key, label) for key, label in pairs if label in _DLQ_LABELS]
     for key, label in dlqs:
         print(f"\n=== DLQ: {label} ({key}) ===")
         try:
@@ -234,29 +305,39 @@ def main() -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument("--section", choices=["rag", "persist", "both"], default="both")
     ap.add_argument("--verbose", action="store_true")
+    ap.add_argument("--pattern", default="ops:hb:*", help="Heartbeat key pattern (namespaced automatically)")
     args = ap.parse_args()
 
-    r = RedisPubSub()
+    r = get_client()
     client = r.client  # low-level redis client
 
-    print("Using REDIS_URL:", os.getenv("REDIS_URL", "(default / local)"))
-    print("Namespace:", rconf.NAMESPACE)
-
-    # Compact overview of known streams
-    overview_known_streams(client)
-
-    if args.section in ("rag", "both"):
-        inspect_stream(client, rconf.STREAM_TASKS, rconf.GROUP_WORKERS, verbose=args.verbose)
-        inspect_stream(client, rconf.STREAM_RESULTS, None, verbose=args.verbose)
-
-    if args.section in ("persist", "both"):
-        inspect_stream(client, rconf.STREAM_TASKS_WRITE, rconf.GROUP_WRITERS, verbose=args.verbose)
-        inspect_stream(client, rconf.STREAM_RESULTS_WRITE, None, verbose=args.verbose)
-
-    # Heartbeats are global; show always
-    inspect_heartbeats(r, verbose=args.verbose)
-    # DLQs are global; show always
-    inspect_dlq(client, verbose=args.verbose)
+    # Collect the whole report in memory and emit it with a single write; the
+    # buffer is flushed even if a section raises part way through.
+    buf = io.StringIO()
+    known = _resolve()  # namespaced keys, resolved once for the whole report
+    try:
+        with contextlib.redirect_stdout(buf):
+            print("Using REDIS_URL:", os.getenv("REDIS_URL", "(default / local)"))
+            print("Namespace:", rconf.NAMESPACE)
+
+            # Compact overview of known streams
+            overview_known_streams(client, known)
+
+            if args.section in ("rag", "both"):
+                inspect_stream(client, rconf.STREAM_TASKS, rconf.GROUP_WORKERS, verbose=args.verbose)
+                inspect_stream(client, rconf.STREAM_RESULTS, None, verbose=args.verbose)
+
+            if args.section in ("persist", "both"):
+                inspect_stream(client, rconf.STREAM_TASKS_WRITE, rconf.GROUP_WRITERS, verbose=args.verbose)
+                inspect_stream(client, rconf.STREAM_RESULTS_WRITE, None, verbose=args.verbose)
+
+            # Heartbeats are global; show always
+            inspect_heartbeats(r, verbose=args.verbose, pattern=args.pattern)
+            # DLQs are global; show always
+            inspect_dlq(client, verbose=args.verbose, pairs=known)
+    finally:
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
 
     r.close()
 
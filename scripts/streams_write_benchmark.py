@@ -1,9 +1,13 @@
 """Benchmark: enqueue N individual write tasks and measure time to completion.
 
 Process:
-- Publish a marker into the results stream to avoid missing early results.
-- Enqueue N insert tasks (one per lead).
-- Block-read the results stream until all task_ids are observed.
+- Publish a marker into the results stream and create a throwaway consumer
+  group at it, so no early result is missed.
+- Start a reader thread (own pinned connection from the shared pool) and, concurrently, enqueue N insert
+  tasks (one per lead) through a pipeline flushed every PIPELINE_FLUSH XADDs
+  (leads are generated lazily, so memory stays bounded). With --lua each chunk
+  is sent as a single EVALSHA that runs the XADDs server-side instead.
+- XREADGROUP the results stream until all task_ids are observed, then drop the group.
 - Print total elapsed time and throughput (tasks/sec).
 """
 from __future__ import annotations
@@ -12,6 +16,7 @@ import argparse
 import json
 import os
 import sys
+import threading
 import time
 from pathlib import Path
 from typing import Dict, Any, Set
@@ -28,30 +33,77 @@ if str(ROOT) not in sys.path:
 
 from agent.tools.redis.client import RedisPubSub
 from agent.tools.redis import config as rconf
-from agent.utils.mock_leads import generate_leads, DEFAULT_CLIENT_IDS, DEFAULT_CAMPAIGN_ID
+from agent.utils.mock_leads import iter_leads, DEFAULT_CLIENT_IDS, DEFAULT_CAMPAIGN_ID
 
+try:
+    import orjson  # type: ignore
+    _loads = orjson.loads
+    _dumpb = orjson.dumps
+except ImportError:  # stdlib fallback
+    _loads = json.loads
+
+    def _dumpb(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+# Upper bound for a single XREADGROUP BLOCK in the results reader
+MAX_BLOCK_MS = 30_000
+# Enqueue pipeline is flushed every this many XADDs, bounding buffered commands
+PIPELINE_FLUSH = 1000
+
+# --lua: XADD every ARGV[2..] blob to KEYS[1] in one command. ARGV[1] is the
+# approximate MAXLEN, or '' for no trimming. Returns the number of entries added.
+XADD_BATCH_LUA = """
+local maxlen = ARGV[1]
+for i = 2, #ARGV do
+    if maxlen ~= '' then
+        redis.call('XADD', KEYS[1], 'MAXLEN', '~', maxlen, '*', 'data', ARGV[i])
+    else
+        redis.call('XADD', KEYS[1], '*', 'data', ARGV[i])
+    end
+end
+return #ARGV - 1
+"""
+
+
+def read_new_results_until(r: RedisPubSub, group: str, wanted: Set[str], timeout: float = 60.0) -> Dict[str, Any]:
+    """Consume the results stream via `group` until every id in `wanted` is seen.
 
-def read_new_results_until(r: RedisPubSub, start_id: str, wanted: Set[str], timeout: float = 60.0) -> Dict[str, Any]:
-    last_id = start_id
-    found: Set[str] = set()
+    Redis tracks the group's delivery cursor, so each XREADGROUP ('>') returns
+    only entries this benchmark has not read yet.
+    """
+    remaining: Set[str] = set(wanted)  # shrinks as results arrive; `wanted` is left intact
     deadline = time.monotonic() + timeout
-    while wanted - found and time.monotonic() < deadline:
-        block_ms = int(max(0, min(1000, (deadline - time.monotonic()) * 1000))) or 1000
-        res = r.xread({rconf.STREAM_RESULTS_WRITE: last_id}, count=100, block=block_ms)
+    # One read can drain the whole backlog; BLOCK for whatever time is left
+    # (capped) instead of waking up every second.
+    count = max(1024, len(wanted))
+    while remaining and time.monotonic() < deadline:
+        block_ms = int(min(MAX_BLOCK_MS, (deadline - time.monotonic()) * 1000))
+        if block_ms <= 0:
+            break
+        res = r.xreadgroup(group, "bench", {rconf.STREAM_RESULTS_WRITE: ">"}, count=count, block=block_ms)
         if not res:
             continue
         for _stream, entries in res:
-            for msg_id, fields in entries:
-                last_id = msg_id
-                data = fields.get("data")
+            for _msg_id, fields in entries:
+                # Client runs with decode_responses=False, so fields arrive as bytes
+                raw = fields.get(b"data")
+                if isinstance(raw, str):
+                    raw = raw.encode()
+                # Cheap substring probe before paying for a full parse
+                if not raw or b"task_id" not in raw:
+                    continue
                 try:
-                    obj = json.loads(data) if isinstance(data, str) else data
+                    obj = _loads(raw)
                     tid = obj.get("task_id") if isinstance(obj, dict) else None
-                    if isinstance(tid, str) and tid in wanted:
-                        found.add(tid)
+                    if tid in remaining:
+                        remaining.discard(tid)
+                        if not remaining:
+                            # Last one seen: skip the rest of the batch; the
+                            # while condition then ends the read loop.
+                            break
                 except Exception:
                     continue
-    return {"found": len(found), "remaining": len(wanted - found), "last_id": last_id}
+    return {"found": len(wanted) - len(remaining), "remaining": len(remaining)}
 
 
 def main() -> None:
@@ -59,42 +111,82 @@ def main() -> None:
     ap.add_argument("--count", type=int, default=20)
     ap.add_argument("--timeout", type=float, default=60.0)
     ap.add_argument("--client-id", dest="client_id", action="append")
+    ap.add_argument("--lua", action="store_true", help="Enqueue each chunk with one Lua EVALSHA instead of a pipeline")
     args = ap.parse_args()
+    # Parsed once; shared by the marker XADD and every task XADD
+    maxlen = int(os.getenv("STREAM_MAXLEN") or 0) or None
 
     client_ids = args.client_id or DEFAULT_CLIENT_IDS
-    profiles = generate_leads(count=args.count, client_ids=client_ids, campaign_id=DEFAULT_CAMPAIGN_ID)
+    n = max(1, int(args.count))  # iter_leads always yields at least one lead
 
-    r = RedisPubSub()
+    r = RedisPubSub(decode_responses=False)
 
     # Insert a marker into results to establish a starting point
     batch_tag = os.urandom(6).hex()
     marker_fields = {"data": json.dumps({"marker": "start", "batch": batch_tag, "ts": time.time()})}
-    marker_id = r.xadd(rconf.STREAM_RESULTS_WRITE, marker_fields, maxlen=int(os.getenv("STREAM_MAXLEN", "0") or 0) or None)
+    marker_id = r.xadd(rconf.STREAM_RESULTS_WRITE, marker_fields, maxlen=maxlen)
+    # Ephemeral group starting right after the marker; destroyed once we are done
+    group = f"bench-{batch_tag}"
+    r.xgroup_create(rconf.STREAM_RESULTS_WRITE, group, id=marker_id, mkstream=True)
+
+    # Enqueue individual tasks; XADDs are pipelined and flushed in chunks
+    tasks_stream = r._chan(rconf.STREAM_TASKS_WRITE)
+    # Task JSON is spliced from bytes: only the id and the lead's values change per
+    # task ({task_id, table, op, values, returning, batch}). task_id/batch are hex.
+    head = b'{"task_id":"'
+    mid = b'","table":"leads","op":"insert","values":'
+    tail = b',"returning":true,"batch":"' + batch_tag.encode() + b'"}'
+    # One getrandom() for all ids, outside the timed region. Ids are fixed up
+    # front so the reader thread can start before the first XADD.
+    rand_pool = os.urandom(8 * n)
+    ids = [rand_pool[i * 8:(i + 1) * 8].hex() for i in range(n)]
+    task_ids: Set[str] = set(ids)
+
+    # Reader drains results while we enqueue. It pins its own connection from
+    # r's pool, since a single connection must not be shared across threads.
+    stats: Dict[str, Any] = {}
+
+    def _read() -> None:
+        with r.dedicated_connection() as reader:
+            stats.update(read_new_results_until(reader, group, task_ids, timeout=args.timeout))
 
-    # Enqueue individual tasks
-    task_ids = []
     start = time.perf_counter()
-    for prof in profiles:
-        task_id = os.urandom(8).hex()
-        task = {
-            "task_id": task_id,
-            "table": "leads",
-            "op": "insert",
-            "values": prof,
-            "returning": True,
-            "batch": batch_tag,
-        }
-        r.xadd(
-            rconf.STREAM_TASKS_WRITE,
-            {"data": json.dumps(task)},
-            maxlen=int(os.getenv("STREAM_MAXLEN", "0") or 0) or None,
-        )
-        task_ids.append(task_id)
-
-    # Wait for all results
-    stats = read_new_results_until(r, marker_id, set(task_ids), timeout=args.timeout)
-    end = time.perf_counter()
-    r.close()
+    reader_thread = threading.Thread(target=_read, name="bench-reader", daemon=True)
+    reader_thread.start()
+    try:
+        # Leads are generated lazily, so memory stays bounded by PIPELINE_FLUSH
+        profiles = iter_leads(count=n, client_ids=client_ids, campaign_id=DEFAULT_CAMPAIGN_ID)
+        blobs = (head + tid.encode() + mid + _dumpb(prof) + tail for tid, prof in zip(ids, profiles))
+        if args.lua:
+            # register_script handles EVALSHA with an EVAL fallback on NOSCRIPT
+            xadd_batch = r.client.register_script(XADD_BATCH_LUA)
+            maxlen_arg = str(maxlen) if maxlen else ""
+            chunk = []
+            for task_blob in blobs:
+                chunk.append(task_blob)
+                if len(chunk) == PIPELINE_FLUSH:
+                    xadd_batch(keys=[tasks_stream], args=[maxlen_arg, *chunk])
+                    chunk.clear()
+            if chunk:
+                xadd_batch(keys=[tasks_stream], args=[maxlen_arg, *chunk])
+        else:
+            pipe = r.pipeline(transaction=False)
+            for i, task_blob in enumerate(blobs, 1):
+                pipe.xadd(tasks_stream, {"data": task_blob}, maxlen=maxlen)
+                if i % PIPELINE_FLUSH == 0:
+                    pipe.execute()
+            pipe.execute()
+
+        # Wait for all results
+        reader_thread.join()
+        end = time.perf_counter()
+    finally:
+        # No XACK needed: the group (and its pending list) goes away with it
+        try:
+            r.client.xgroup_destroy(r._chan(rconf.STREAM_RESULTS_WRITE), group)
+        except Exception:
+            pass
+        r.close()
 
     elapsed = end - start
     throughput = (len(task_ids) / elapsed) if elapsed > 0 else None
@@ -104,8 +196,8 @@ def main() -> None:
                 "tasks": len(task_ids),
                 "elapsed_sec": round(elapsed, 3),
                 "tasks_per_sec": round(throughput, 2) if throughput is not None else None,
-                "found": stats["found"],
-                "remaining": stats["remaining"],
+                "found": stats.get("found", 0),
+                "remaining": stats.get("remaining", len(task_ids)),
             },
             indent=2,
         )
@@ -11,27 +11,24 @@ It will attempt a simple select * limit 1 on the provided table (default 'leads'
 No mutations are performed.
 """
 from __future__ import annotations
-import os, sys, json, time, pathlib
+import os, re, sys, json, time, pathlib
+
+# KEY=value lines; comment lines never match since keys cannot start with '#'.
+# [ \t] rather than \s so a match can never run across a newline.
+_ENV_LINE = re.compile(rb"(?m)^[ \t]*([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*(.*?)[ \t]*\r?$")
 
 def _load_env_file():
     """Lightweight .env loader (avoids extra dependency on python-dotenv).
 
     Only populates variables that are not already set in the process env.
     Lines beginning with '#' are ignored. Quotes are not stripped (keep simple).
+    The file is parsed in a single regex pass over its bytes.
     """
     env_path = pathlib.Path('.env')
     if not env_path.exists():
         return
-    for line in env_path.read_text(encoding='utf-8').splitlines():
-        if not line.strip() or line.strip().startswith('#'):
-            continue
-        if '=' not in line:
-            continue
-        key, val = line.split('=', 1)
-        key = key.strip()
-        val = val.strip()
-        if key and key not in os.environ:
-            os.environ[key] = val
+    for m in _ENV_LINE.finditer(env_path.read_bytes()):
+        os.environ.setdefault(m.group(1).decode('utf-8'), m.group(2).decode('utf-8'))
 
 def main():
     # Attempt local .env bootstrap first
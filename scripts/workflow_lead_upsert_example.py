@@ -10,7 +10,7 @@ Optional PERSIST_ALLOWED_TABLES to restrict tables (comma-separated).
 import os
 import sys
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -23,6 +23,8 @@ if str(ROOT) not in sys.path:
 
 from agent.operational_agents.persistence_agent.persistence_agent import create_persistence_agent
 
+_today_iso = datetime.now(timezone.utc).date().isoformat() + 'T00:00:00Z'
+
 lead_record = {
     'email': 'workflow+example@example.com',
     'client_id': '90fd5909-89fb-4a7f-afa9-d17810496768',
@@ -35,8 +37,8 @@ lead_record = {
     'current_status': 'new',
     'sequence_step': 0,
     'sequence_active': True,
-    'next_action_date': datetime.utcnow().date().isoformat() + 'T00:00:00Z',
-    'last_contact_date': datetime.utcnow().date().isoformat() + 'T00:00:00Z',
+    'next_action_date': _today_iso,
+    'last_contact_date': _today_iso,
     'booking_status': 'unbooked',
     're_engagement_date': '2030-01-01T00:00:00Z'
 }
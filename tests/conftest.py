@@ -1,28 +1,38 @@
+import logging
 import os
-import json
-import contextvars
+import re
+import sys
+import hashlib
+import tempfile
+from dataclasses import dataclass
+from functools import cache
 from pathlib import Path
 import time
+from typing import NamedTuple
 import pytest  # noqa
 
 # --- .env loader -----------------------------------------------------------
 
+# KEY=value, KEY="value" or KEY='value', with an optional trailing comment.
+# '#' only starts a comment after whitespace, so bare values such as
+# postgres://u:p#ss@h/db keep their '#'. [ \t] (not \s) keeps every match
+# on a single line.
+_ENV_RE = re.compile(
+    r'(?m)^[ \t]*([A-Za-z_][A-Za-z0-9_]*)[ \t]*=[ \t]*'
+    r'(?:"([^"\r\n]*)"|\'([^\'\r\n]*)\'|([^\r\n]*?))(?:[ \t]+#[^\r\n]*)?[ \t]*\r?$'
+)
+
 def _load_env_file(filename: str = '.env'):
-    """Lightweight .env loader (no external dependency)."""
+    """Lightweight .env loader (no external dependency); one regex pass over the file."""
     root = Path(__file__).resolve().parent.parent
     env_path = root / filename
     if not env_path.exists():
         return
     try:
-        for line in env_path.read_text().splitlines():
-            line = line.strip()
-            if not line or line.startswith('#') or '=' not in line:
-                continue
-            k, v = line.split('=', 1)
-            k = k.strip()
-            v = v.strip().strip('"').strip("'")
-            if k and k not in os.environ:
-                os.environ[k] = v
+        text = env_path.read_bytes().decode('utf-8', 'replace')
+        for m in _ENV_RE.finditer(text):
+            k, dq, sq, bare = m.groups()
+            os.environ.setdefault(k, dq if dq is not None else sq if sq is not None else bare)
     except Exception:
         pass
 
@@ -35,6 +45,169 @@ def pytest_runtest_setup(item):
     if LIVE_NETWORK_DISABLED and 'live_integration' in item.keywords:
         pytest.skip('Live integration tests disabled by DISABLE_LIVE_INTEGRATION env flag')
 
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'rag: test exercises RAGAgent (enables RAG run/tool capture)')
+    # Test modules log debug lines under the shared 'tests' logger
+    # (getLogger('tests.' + __name__)). WARNING skips formatting entirely;
+    # RAG_DEBUG=1 lets pytest capture the lines.
+    logging.getLogger('tests').setLevel(logging.DEBUG if _env_on('RAG_DEBUG') else logging.WARNING)
+
+def pytest_collection_modifyitems(config, items):
+    # Only RAG tests get the per-test capture context; everything else pays nothing
+    for item in items:
+        if _is_rag_item(item) and '_rag_test_context' not in item.fixturenames:
+            item.fixturenames.append('_rag_test_context')
+
+# --- Shared seed data ------------------------------------------------------
+
+# Canonical rows for RAG read tests: one or two per table, keyed by table
+_SEED_ROWS = {
+    'leads': [
+        {'email': 'alice@example.com', 'company_name': 'Acme', 'client_id': 'c1'},
+        {'email': 'bob@example.org', 'company_name': 'BetaCorp', 'client_id': 'c1'},
+    ],
+    'staging_leads': [{'email': 'staging@example.com'}],
+    'conversations': [{'topic': 'welcome sequence', 'client_id': 'c1'}],
+    'messages': [{'conversation_id': '1', 'direction': 'outbound', 'body': 'Hello Alice'}],
+    'inquiries': [{'email': 'alice@example.com', 'status': 'open'}],
+    'campaigns': [{'name': 'Fall Outreach', 'status': 'active'}],
+    'clients': [{'name': 'Acme', 'tier': 'gold'}],
+}
+
+@pytest.fixture(scope='session')
+def seeded_adapter_prototype():
+    """InMemoryAdapter holding _SEED_ROWS, built once per session.
+
+    Treat it as read-only: module fixtures take copy.deepcopy() of it rather
+    than re-running the seed writes.
+    """
+    from agent.tools.persistence.adapters.in_memory_adapter import InMemoryAdapter
+    adapter = InMemoryAdapter()
+    for table, rows in _SEED_ROWS.items():
+        adapter.batch_write(table, rows)
+    return adapter
+
+@pytest.fixture(scope='session')
+def seeded_rag_inmemory():
+    """Return get(key, rows) -> read-only RAGAgent over an in-memory 'leads' table.
+
+    One agent is built per dataset key and reused for the rest of the session,
+    so modules seeding the same rows share one service. Callers must not write
+    through it.
+    """
+    from agent.tools.persistence.adapters.in_memory_adapter import InMemoryAdapter
+    from agent.tools.persistence.service import PersistenceService, ReadOnlyPersistenceFacade
+    from agent.operational_agents.rag_agent.rag_agent import RAGAgent
+    agents = {}
+
+    def get(key: str, rows):
+        rag = agents.get(key)
+        if rag is None:
+            svc = PersistenceService(InMemoryAdapter(), allowed_tables=['leads'])
+            svc.batch_write('leads', rows)  # the service copies each row
+            rag = agents[key] = RAGAgent(read_only_persistence=ReadOnlyPersistenceFacade(svc))
+        return rag
+
+    return get
+
+# --- Envelope assertions ---------------------------------------------------
+
+def _assert_envelope(env, *, channel=None, has_subject=False, has_body=False, text=False):
+    """Assert `env` is a metadata/records envelope and return its first record.
+
+    channel: expected ``record['channel']`` when given.
+    has_subject / has_body: ``record['content']`` must carry that key.
+    text: ``record['content']`` must be a plain string.
+    """
+    assert "metadata" in env and "records" in env
+    rec = env["records"][0]
+    if channel is not None:
+        assert rec["channel"] == channel
+    content = rec.get("content")
+    if has_subject:
+        assert "subject" in content
+    if has_body:
+        assert "body" in content
+    if text:
+        assert isinstance(content, str)
+    return rec
+
+@pytest.fixture(scope='session')
+def assert_envelope():
+    """The shared envelope-shape assertion (see _assert_envelope)."""
+    return _assert_envelope
+
+# --- Queue fixtures --------------------------------------------------------
+
+@pytest.fixture(scope='session')
+def queue_factory():
+    """Callable building an InMemoryQueue with test-sized timeouts.
+
+    Short visibility timeout keeps worker tests from being bound by the
+    production 30 s default, and requeue_check_interval=None requeues
+    expired jobs inside dequeue instead of polling from a background thread.
+    Keyword overrides are passed through.
+    """
+    from agent.Infastructure.queue.in_memory import InMemoryQueue
+
+    def make(**overrides):
+        return InMemoryQueue(**{'visibility_timeout': 0.05, 'requeue_check_interval': None, **overrides})
+
+    return make
+
+@pytest.fixture
+def queue(queue_factory, request):
+    """Fresh InMemoryQueue per test, stopped at teardown."""
+    q = queue_factory()
+    request.addfinalizer(q.stop)
+    return q
+
+# --- Real Supabase fixtures ------------------------------------------------
+# Session scope is per xdist worker, so tests using these fixtures carry
+# xdist_group("supabase"): under --dist loadgroup they all land on one worker
+# and the client is built once instead of once per worker.
+
+REAL_SUPABASE_AVAILABLE = (
+    os.environ.get('USE_REAL_TESTS') == '1'
+    and bool(os.environ.get('SUPABASE_URL') and (os.environ.get('SUPABASE_SERVICE_KEY') or os.environ.get('SUPABASE_KEY')))
+)
+
+@pytest.fixture(scope='session')
+def _real_supabase():
+    """Skip gate for real-integration fixtures; the Supabase client is never imported when it skips."""
+    if not REAL_SUPABASE_AVAILABLE:
+        pytest.skip('Requires real Supabase credentials in env')
+
+@pytest.fixture(scope='session')
+def rag_real(_real_supabase):
+    """Supabase-backed RAGAgent (read-only facade), built once per session."""
+    from agent.operational_agents.factory import create_rag_agent
+    return create_rag_agent(kind='supabase')
+
+@pytest.fixture(scope='session')
+def rag_real_llm(_real_supabase):
+    """Separate Supabase-backed agent for LLM-fallback tests (RAG_DEBUG on by default)."""
+    os.environ.setdefault('RAG_DEBUG', '1')
+    from agent.operational_agents.factory import create_rag_agent
+    return create_rag_agent(kind='supabase')
+
+@pytest.fixture(scope='session')
+def one_valid_lead(rag_real):
+    """Fetch a small list of leads and return one record as a source of valid values.
+
+    This avoids hard-coding any specific ID/email/company in tests. Read-only,
+    so one sample serves the whole session.
+    """
+    env = rag_real.run('find leads', return_json=True, limit=5)
+    recs = env.get('records') or []
+    if not recs:
+        pytest.skip('No leads available in Supabase to sample for valid tests')
+    # find a record with the expected fields
+    for r in recs:
+        if isinstance(r, dict) and (r.get('email') or r.get('company_name') or r.get('id')):
+            return r
+    pytest.skip('No usable lead (email/company_name/id) available to sample')
+
 # --- CLI options to control RAG debug/capture ------------------------------
 
 def pytest_addoption(parser):  # noqa
@@ -83,13 +256,50 @@ def pytest_addoption(parser):  # noqa
 
 # --- RAG run capture / summary ---------------------------------------------
 
-_current_test = contextvars.ContextVar('rag_current_test', default=None)
-_captured_runs: list[dict] = []  # every run (intermediate + final)
-_captured_tools: list[dict] = []  # tool-level IO traces (input filters + envelope)
+# Node id of the running test. Tests run one at a time per process (xdist
+# workers are separate processes), so a plain module global is enough.
+_current_test_nodeid: str | None = None
+
+
+class RunRec(NamedTuple):
+    """One captured RAGAgent.run envelope (converted to a dict only for JSON)."""
+    test: str | None
+    t_ms: float | None
+    total_count: int | None
+    fallback: str | None
+    truncated: bool | None
+    summary_present: bool
+    filters: dict | None
+    attempts: int | None
+    kind: str
+    status: str
+    ident: str | None
+    records_preview: list
+    agent_response_preview: str | None
+
+
+class ToolRec(NamedTuple):
+    """One captured query_leads_tool envelope."""
+    test: str | None
+    t_ms: float | None
+    total_count: int | None
+    filters: dict | None
+    kind: str
+    status: str
+    ident: str | None
+    records_preview: list
+
+
+_captured_runs: list[RunRec] = []  # every run (intermediate + final)
+_captured_tools: list[ToolRec] = []  # tool-level IO traces (input filters + envelope)
+# Last capture per test id, kept current on append so session finish needs no pass
+_latest_by_test: dict[str, RunRec] = {}
+_latest_tools_by_test: dict[str, ToolRec] = {}
 
 # Config via env
 RAG_SUMMARY_JSON = os.environ.get('RAG_SUMMARY_JSON', 'rag_summary.json')
 RAG_SUMMARY_DISABLE_FILE = os.environ.get('RAG_SUMMARY_DISABLE_FILE') in ('1','true','TRUE')
+RAG_SUMMARY_FORCE_WRITE = os.environ.get('RAG_SUMMARY_FORCE_WRITE') in ('1','true','TRUE')
 RAG_SUMMARY_COLOR = os.environ.get('RAG_SUMMARY_COLOR', '1') not in ('0','false','FALSE')
 RAG_SUMMARY_SHOW_INTERMEDIATE = os.environ.get('RAG_SUMMARY_INTERMEDIATE', '1') not in ('0','false','FALSE')
 RAG_SUMMARY_INCLUDE_RECORDS = os.environ.get('RAG_SUMMARY_INCLUDE_RECORDS', '1') in ('1','true','TRUE')
@@ -97,11 +307,20 @@ RAG_SUMMARY_RECORDS_N = int(os.environ.get('RAG_SUMMARY_RECORDS_N', os.environ.g
 RAG_SUMMARY_FULL_ROWS = os.environ.get('RAG_SUMMARY_FULL_ROWS', os.environ.get('RAG_PRINT_RECORDS_FULL') or '0') in ('1','true','TRUE')
 RAG_SUMMARY_RECORD_FIELDS = [f.strip() for f in (os.environ.get('RAG_SUMMARY_RECORD_FIELDS') or os.environ.get('RAG_RECORD_FIELDS') or 'email,company_name,id').split(',') if f.strip()]
 
-def _color(code: str, text: str) -> str:
-    if not RAG_SUMMARY_COLOR:
+if RAG_SUMMARY_COLOR:
+    # ANSI SGR prefixes for every code used below, built once at import
+    _COLOR_PREFIX = {c: f"\033[{c}m" for c in ('31', '32', '33', '34', '35', '36', '37', '90', '92')}
+    _COLOR_RESET = "\033[0m"
+
+    def _color(code: str, text: str) -> str:
+        return _COLOR_PREFIX[code] + text + _COLOR_RESET
+else:
+    def _color(code: str, text: str) -> str:
         return text
-    return f"\033[{code}m{text}\033[0m"
 
+# Fallback labels come from a small fixed vocabulary and _color is fixed at
+# import, so the colored strings can be memoized.
+@cache
 def _fmt_fallback(fb):
     if fb == 'agent':
         return _color('35', str(fb))  # magenta
@@ -113,431 +332,351 @@ def _fmt_fallback(fb):
         return _color('36', str(fb))
     return _color('32', 'none')  # green
 
+# (filter key, label) in priority order for identification summaries
+_IDENT_KEYS = (('id', 'id'), ('email', 'email'), ('company_name', 'company'), ('company', 'company'))
+
 def _extract_ident(filters: dict | None) -> str | None:
     if not isinstance(filters, dict):
         return None
-    if 'id' in filters:
-        return f"id={filters.get('id')}"
-    if 'email' in filters:
-        return f"email={filters.get('email')}"
-    if 'company_name' in filters:
-        return f"company={filters.get('company_name')}"
-    if 'company' in filters:
-        return f"company={filters.get('company')}"
+    for key, label in _IDENT_KEYS:
+        if key in filters:
+            return f"{label}={filters[key]}"
     return None
 
 def _preview_rows(rows: list[dict] | None, n: int, full: bool, fields: list[str]) -> list:
+    # Previews are read-only (only serialized at session end), so rows are
+    # referenced rather than copied.
     if not rows:
         return []
+    head = rows[: max(0, n)]
+    if full:
+        return list(head)
     out = []
-    for row in rows[: max(0, n)]:
+    for row in head:
         if not isinstance(row, dict):
             out.append(row)
             continue
+        sel = {f: row[f] for f in fields if f in row}
+        out.append(sel or row)
+    return out
+
+def _emit_ident_status(out: list[str], total_count, filters, ident: str | None) -> None:
+    """Append the colored [IDENT OK]/[IDENT FAIL] line for one RAG result to out."""
+    detail = ident or (f"filters={filters}" if filters else "no filters")
+    if total_count in (0, None):
+        out.append(_color('31', f"[IDENT FAIL] failed identification ({detail})"))
+    else:
+        out.append(_color('32', f"[IDENT OK] identification succeeded ({detail}); rows={total_count}"))
+
+_PREVIEW_MAX_CHARS = 8000
+
+class _TruncErr(Exception):
+    pass
+
+class _TruncWriter:
+    """File-like sink for json.dump that aborts once `limit` chars were written."""
+    __slots__ = ('buf', 'n', 'limit')
+
+    def __init__(self, limit: int):
+        self.buf: list[str] = []
+        self.n = 0
+        self.limit = limit
+
+    def write(self, s: str) -> None:
+        self.buf.append(s)
+        self.n += len(s)
+        if self.n > self.limit:
+            raise _TruncErr
+
+def _preview_json(row, limit: int = _PREVIEW_MAX_CHARS) -> str:
+    """JSON for a preview line, serializing at most ~limit chars of huge rows."""
+    import json
+    w = _TruncWriter(limit)
+    try:
+        json.dump(row, w, default=str)
+    except _TruncErr:
+        return ''.join(w.buf)[:limit] + '...<truncated>'
+    except Exception:
+        return str(row)
+    return ''.join(w.buf)
+
+def _emit_records_preview(out: list[str], rows, n: int, full: bool, fields, label: str) -> None:
+    """Append up to n rows as '[{label} i] ...' (selected fields) or '[{label} FULL i] ...' (JSON)."""
+    for i, row in enumerate((rows or [])[:n]):
         if full:
-            out.append(dict(row))
+            txt = _preview_json(row)
+            out.append(_color('92', f"[{label} FULL {i+1}] {txt}"))
         else:
-            sel = {}
-            for f in fields:
-                if f in row:
-                    sel[f] = row.get(f)
-            out.append(sel or dict(row))
-    return out
+            pieces = [f"{f}={row.get(f)}" for f in fields if f in row]
+            out.append(_color('92', f"[{label} {i+1}] " + (', '.join(pieces) if pieces else str(row)[:200])))
+
+def _flush_lines(out: list[str]) -> None:
+    """Write buffered wrapper output with a single stdout write."""
+    if out:
+        sys.stdout.write('\n'.join(out) + '\n')
 
-@pytest.fixture(autouse=True)
-def _rag_test_context(request, monkeypatch):
-    """Autouse fixture to capture RAGAgent.run JSON envelopes for summary.
+@pytest.fixture
+def _rag_test_context(request):
+    """Tag RAG captures with the running test's node id.
 
-    We monkeypatch RAGAgent.run once (first use) to wrap and collect the final envelope
-    whenever return_json=True. Multiple invocations in one test all get recorded.
+    Attached by pytest_collection_modifyitems to RAG tests only (rag marker or
+    'rag' in the node id). The RAGAgent wrappers themselves are installed once
+    per session by _rag_session_patch; this fixture only sets/resets the test.
     """
-    token = _current_test.set(request.node.nodeid)
-    cfg = request.config
-    rag_verbose = bool(cfg.getoption("--rag-verbose"))
-    rag_capture_tools = bool(cfg.getoption("--rag-capture-tools")) or os.environ.get('RAG_CAPTURE_TOOLS') in ('1','true','TRUE')
-    rag_print_records = bool(cfg.getoption("--rag-print-records")) or os.environ.get('RAG_PRINT_RECORDS') in ('1','true','TRUE')
-    rag_print_records_full = bool(cfg.getoption("--rag-print-records-full")) or os.environ.get('RAG_PRINT_RECORDS_FULL') in ('1','true','TRUE')
-    rag_deep_debug = bool(cfg.getoption("--rag-deep-debug")) or os.environ.get('RAG_DEEP_DEBUG') in ('1','true','TRUE')
+    global _current_test_nodeid
+    prev = _current_test_nodeid
+    _current_test_nodeid = request.node.nodeid
     try:
-        _n_opt = cfg.getoption("--rag-records-n")
-    except Exception:
-        _n_opt = None
-    try:
-        _fields_opt = cfg.getoption("--rag-record-fields")
-    except Exception:
-        _fields_opt = None
-    preview_n = int((_n_opt or os.environ.get('RAG_PRINT_RECORDS_N') or 3))
-    fields_raw = (_fields_opt or os.environ.get('RAG_RECORD_FIELDS') or 'email,company_name,id')
-    record_fields = [f.strip() for f in fields_raw.split(',') if f.strip()]
+        yield
+    finally:
+        _current_test_nodeid = prev
+
+_TRUTHY = ('1', 'true', 'TRUE')
+
+def _env_on(name: str) -> bool:
+    return os.environ.get(name) in _TRUTHY
+
+@dataclass(slots=True, frozen=True)
+class RagCfg:
+    """RAG debug/capture switches, resolved once per session from CLI + env."""
+    rag_verbose: bool
+    rag_capture_tools: bool
+    rag_print_records: bool
+    rag_print_records_full: bool
+    rag_deep_debug: bool
+    rag_debug_io: bool
+    preview_n: int
+    record_fields: tuple[str, ...]
+
+@pytest.fixture(scope='session')
+def _rag_cfg(pytestconfig) -> RagCfg:
+    """Resolve the --rag-* options and RAG_* env toggles exactly once."""
+    opt = pytestconfig.getoption
+    rag_verbose = bool(opt("--rag-verbose"))
+    fields_raw = opt("--rag-record-fields") or os.environ.get('RAG_RECORD_FIELDS') or 'email,company_name,id'
+    return RagCfg(
+        rag_verbose=rag_verbose,
+        rag_capture_tools=bool(opt("--rag-capture-tools")) or _env_on('RAG_CAPTURE_TOOLS'),
+        rag_print_records=bool(opt("--rag-print-records")) or _env_on('RAG_PRINT_RECORDS'),
+        rag_print_records_full=bool(opt("--rag-print-records-full")) or _env_on('RAG_PRINT_RECORDS_FULL'),
+        rag_deep_debug=bool(opt("--rag-deep-debug")) or _env_on('RAG_DEEP_DEBUG'),
+        rag_debug_io=rag_verbose or _env_on('RAG_DEBUG_IO'),
+        preview_n=int(opt("--rag-records-n") or os.environ.get('RAG_PRINT_RECORDS_N') or 3),
+        record_fields=tuple(f.strip() for f in fields_raw.split(',') if f.strip()),
+    )
+
+def _is_rag_item(item) -> bool:
+    """True for tests that exercise the RAG agent (by marker or by name/path)."""
+    return 'rag' in item.keywords or 'rag' in item.nodeid.lower()
+
+@pytest.fixture(autouse=True, scope='session')
+def _rag_session_patch(request, _rag_cfg):
+    """Wrap RAGAgent.run and RAGAgent.query_leads_tool once per session.
+
+    run: collects the final envelope whenever return_json=True; multiple
+    invocations in one test all get recorded. query_leads_tool: captures
+    tool-level I/O even when agents are built in class-scoped fixtures before
+    per-test fixtures run. Wrappers are plain setattr (never undone): they are
+    transparent pass-throughs, so there is nothing to restore between tests,
+    and a session-scoped fixture runs once so no re-entry guard is needed.
+    """
+    cfg = _rag_cfg
+    # Sessions with no RAG flags and no RAG tests never import the agent module
+    rag_flags = cfg.rag_verbose or cfg.rag_capture_tools or cfg.rag_print_records or cfg.rag_deep_debug
+    if not rag_flags and not any(_is_rag_item(item) for item in request.session.items):
+        return
 
     # Propagate env toggles for in-agent color logs when requested
-    if rag_verbose:
+    if cfg.rag_verbose:
         os.environ.setdefault('RAG_DEBUG_IO', '1')
-    # Propagate capture intent for any early session-level patches
-    if rag_capture_tools:
+    if cfg.rag_capture_tools:
         os.environ.setdefault('RAG_CAPTURE_TOOLS', '1')
-    if rag_deep_debug:
+    if cfg.rag_deep_debug:
         os.environ.setdefault('RAG_DEEP_DEBUG', '1')
-    # Only patch once per session
-    from agent.operational_agents.rag_agent import rag_agent as rag_module
-    RAGAgent = getattr(rag_module, 'RAGAgent')
-
-    if not getattr(RAGAgent, '_rag_run_patched', False):
-        original_run = RAGAgent.run
 
-        def wrapped(self, *a, **k):  # type: ignore
-            started = time.time()
-            result = original_run(self, *a, **k)
-            elapsed_ms = (time.time() - started) * 1000.0
-            try:
-                if isinstance(result, dict) and 'metadata' in result and 'records' in result:
-                    total = result['metadata'].get('total_count')
-                    status = 'success' if isinstance(total, int) and total > 0 else 'fail'
-                    filters_meta = result['metadata'].get('query_filters')
-                    ident_detail = _extract_ident(filters_meta)
-                    records_preview = _preview_rows(result.get('records'), RAG_SUMMARY_RECORDS_N, RAG_SUMMARY_FULL_ROWS, RAG_SUMMARY_RECORD_FIELDS) if RAG_SUMMARY_INCLUDE_RECORDS else []
-                    agent_preview = None
-                    if status == 'fail':
-                        # try to surface agent response preview if any
-                        try:
-                            for r in (result.get('records') or []):
-                                if isinstance(r, dict) and 'response' in r:
-                                    agent_preview = str(r.get('response'))[:400]
-                                    break
-                        except Exception:
-                            pass
-                    rec = {
-                        'test': _current_test.get(),
-                        't_ms': round(elapsed_ms, 2),
-                        'total_count': total,
-                        'fallback': result['metadata'].get('fallback'),
-                        'truncated': result['metadata'].get('truncated'),
-                        'summary_present': 'summary' in result['metadata'],
-                        'filters': filters_meta,
-                        'attempts': result['metadata'].get('reformulation_attempts'),
-                        'kind': 'run',
-                        'status': status,
-                        'ident': ident_detail,
-                        'records_preview': records_preview,
-                        'agent_response_preview': agent_preview,
-                    }
-                    _captured_runs.append(rec)
-                    if RAG_SUMMARY_SHOW_INTERMEDIATE:
-                        print(_color('90', f"[RAG RUN] {rec['test']} count={rec['total_count']} fb={rec['fallback']} ms={rec['t_ms']} filters={rec['filters']}"))
-                        # Colorized identification failure when zero results
-                        if rag_verbose and (rec['total_count'] in (0, None)):
-                            f = rec.get('filters') or {}
-                            ident = None
-                            if isinstance(f, dict):
-                                if 'id' in f:
-                                    ident = f"id={f.get('id')}"
-                                elif 'email' in f:
-                                    ident = f"email={f.get('email')}"
-                                elif 'company_name' in f:
-                                    ident = f"company={f.get('company_name')}"
-                                elif 'company' in f:
-                                    ident = f"company={f.get('company')}"
-                            detail = ident or (f"filters={f}" if f else "no filters")
-                            print(_color('31', f"[IDENT FAIL] failed identification ({detail})"))
-                        # Colorized identification success marker when rows found
-                        if rag_verbose and isinstance(rec.get('total_count'), int) and rec['total_count'] > 0:
-                            f = rec.get('filters') or {}
-                            ident = None
-                            if isinstance(f, dict):
-                                if 'id' in f:
-                                    ident = f"id={f.get('id')}"
-                                elif 'email' in f:
-                                    ident = f"email={f.get('email')}"
-                                elif 'company_name' in f:
-                                    ident = f"company={f.get('company_name')}"
-                                elif 'company' in f:
-                                    ident = f"company={f.get('company')}"
-                            detail = ident or (f"filters={f}" if f else "no filters")
-                            print(_color('32', f"[IDENT OK] identification succeeded ({detail}); rows={rec['total_count']}"))
-                    # Optional record preview for quick visual of outputs
-                    if rag_print_records and rag_verbose:
-                        try:
-                            rows = result.get('records') or []
-                            for i, row in enumerate(rows[:preview_n]):
-                                if rag_print_records_full:
-                                    try:
-                                        import json as _json
-                                        txt = _json.dumps(row, default=str)
-                                    except Exception:
-                                        txt = str(row)
-                                    if len(txt) > 8000:
-                                        txt = txt[:8000] + '...<truncated>'
-                                    print(_color('92', f"[RAG OUT FULL {i+1}] {txt}"))
-                                else:
-                                    pieces = []
-                                    for f in record_fields:
-                                        if f in row:
-                                            pieces.append(f"{f}={row.get(f)}")
-                                    print(_color('92', f"[RAG OUT {i+1}] " + (', '.join(pieces) if pieces else str(row)[:200])))
-                        except Exception:
-                            pass
-            except Exception:  # pragma: no cover - defensive
-                pass
-            return result
+    try:
+        from agent.operational_agents.rag_agent import rag_agent as rag_module
+        RAGAgent = getattr(rag_module, 'RAGAgent')
+    except Exception:
+        return
 
-        monkeypatch.setattr(RAGAgent, 'run', wrapped, raising=True)
-        setattr(RAGAgent, '_rag_run_patched', True)
+    original_run = RAGAgent.run
 
-    # Optionally patch query_leads_tool to capture inputs/outputs (if not already session-patched)
-    if rag_capture_tools and (not getattr(RAGAgent, '_rag_tools_patched', False)) and (not getattr(RAGAgent, '_rag_tools_patched_early', False)):
+    def wrapped(self, *a, **k):  # type: ignore
+        started = time.perf_counter_ns()
+        result = original_run(self, *a, **k)
+        t_ms = round((time.perf_counter_ns() - started) / 1_000_000, 2)
+        # Envelope check by lookup: non-envelopes (text replies, lists) bail out here
         try:
-            original_tool = RAGAgent.query_leads_tool
-        except Exception:
-            original_tool = None
-
-        if original_tool is not None:
-            def tool_wrapped(self, args):  # type: ignore
-                started = time.time()
-                filters = None
+            md = result['metadata']
+            records = result['records']
+        except (TypeError, KeyError):
+            return result
+        out: list[str] = []
+        try:
+            total = md.get('total_count')
+            status = 'success' if isinstance(total, int) and total > 0 else 'fail'
+            filters_meta = md.get('query_filters')
+            ident_detail = _extract_ident(filters_meta)
+            records_preview = _preview_rows(records, RAG_SUMMARY_RECORDS_N, RAG_SUMMARY_FULL_ROWS, RAG_SUMMARY_RECORD_FIELDS) if RAG_SUMMARY_INCLUDE_RECORDS else []
+            agent_preview = None
+            if status == 'fail':
+                # try to surface agent response preview if any
                 try:
-                    if isinstance(args, dict) and isinstance(args.get('filters'), dict):
-                        filters = dict(args.get('filters'))
+                    for r in (records or []):
+                        if isinstance(r, dict) and 'response' in r:
+                            agent_preview = str(r.get('response'))[:400]
+                            break
                 except Exception:
-                    filters = None
-                res = original_tool(self, args)
-                elapsed_ms = (time.time() - started) * 1000.0
+                    pass
+            rec = RunRec(
+                _current_test_nodeid, t_ms, total, md.get('fallback'), md.get('truncated'),
+                'summary' in md, filters_meta, md.get('reformulation_attempts'), 'run',
+                status, ident_detail, records_preview, agent_preview,
+            )
+            _captured_runs.append(rec)
+            _latest_by_test[rec.test] = rec
+            if RAG_SUMMARY_SHOW_INTERMEDIATE:
+                out.append(_color('90', f"[RAG RUN] {rec.test} count={rec.total_count} fb={rec.fallback} ms={rec.t_ms} filters={rec.filters}"))
+                if cfg.rag_verbose:
+                    _emit_ident_status(out, total, filters_meta, ident_detail)
+            # Optional record preview for quick visual of outputs
+            if cfg.rag_print_records and cfg.rag_verbose:
                 try:
-                    if isinstance(res, dict) and 'metadata' in res and 'records' in res:
-                        total = res['metadata'].get('total_count')
-                        status = 'success' if isinstance(total, int) and total > 0 else 'fail'
-                        filters_meta = res['metadata'].get('query_filters') or filters
-                        ident_detail = _extract_ident(filters_meta)
-                        records_preview = _preview_rows(res.get('records'), RAG_SUMMARY_RECORDS_N, RAG_SUMMARY_FULL_ROWS, RAG_SUMMARY_RECORD_FIELDS) if RAG_SUMMARY_INCLUDE_RECORDS else []
-                        rec = {
-                            'test': _current_test.get(),
-                            't_ms': round(elapsed_ms, 2),
-                            'total_count': total,
-                            'filters': filters_meta,
-                            'kind': 'tool.query_leads',
-                            'status': status,
-                            'ident': ident_detail,
-                            'records_preview': records_preview,
-                        }
-                        _captured_tools.append(rec)
-                        if rag_verbose:
-                            print(_color('36', f"[RAG TOOL SEND] filters={filters}"))
-                            print(_color('32', f"[RAG TOOL RECV] count={rec['total_count']}"))
-                            if rec['total_count'] in (0, None):
-                                f2 = rec.get('filters') or filters or {}
-                                ident = None
-                                if isinstance(f2, dict):
-                                    if 'id' in f2:
-                                        ident = f"id={f2.get('id')}"
-                                    elif 'email' in f2:
-                                        ident = f"email={f2.get('email')}"
-                                    elif 'company_name' in f2:
-                                        ident = f"company={f2.get('company_name')}"
-                                    elif 'company' in f2:
-                                        ident = f"company={f2.get('company')}"
-                                detail = ident or (f"filters={f2}" if f2 else "no filters")
-                                print(_color('31', f"[IDENT FAIL] failed identification ({detail})"))
-                            else:
-                                # Success marker for tool path
-                                f2 = rec.get('filters') or filters or {}
-                                ident = None
-                                if isinstance(f2, dict):
-                                    if 'id' in f2:
-                                        ident = f"id={f2.get('id')}"
-                                    elif 'email' in f2:
-                                        ident = f"email={f2.get('email')}"
-                                    elif 'company_name' in f2:
-                                        ident = f"company={f2.get('company_name')}"
-                                    elif 'company' in f2:
-                                        ident = f"company={f2.get('company')}"
-                                detail = ident or (f"filters={f2}" if f2 else "no filters")
-                                print(_color('32', f"[IDENT OK] identification succeeded ({detail}); rows={rec['total_count']}"))
-                            if rag_print_records:
-                                try:
-                                    rows = res.get('records') or []
-                                    for i, row in enumerate(rows[:preview_n]):
-                                        if rag_print_records_full:
-                                            try:
-                                                import json as _json
-                                                txt = _json.dumps(row, default=str)
-                                            except Exception:
-                                                txt = str(row)
-                                            if len(txt) > 8000:
-                                                txt = txt[:8000] + '...<truncated>'
-                                            print(_color('92', f"[RAG TOOL OUT FULL {i+1}] {txt}"))
-                                        else:
-                                            pieces = []
-                                            for f in record_fields:
-                                                if f in row:
-                                                    pieces.append(f"{f}={row.get(f)}")
-                                            print(_color('92', f"[RAG TOOL OUT {i+1}] " + (', '.join(pieces) if pieces else str(row)[:200])))
-                                except Exception:
-                                    pass
-                except Exception:  # pragma: no cover
+                    _emit_records_preview(out, records, cfg.preview_n, cfg.rag_print_records_full, cfg.record_fields, 'RAG OUT')
+                except Exception:
                     pass
-                return res
-
-            monkeypatch.setattr(RAGAgent, 'query_leads_tool', tool_wrapped, raising=True)
-            setattr(RAGAgent, '_rag_tools_patched', True)
-
-    yield
-    _current_test.reset(token)
-
-@pytest.fixture(autouse=True, scope='session')
-def _rag_patch_tools_early():
-    """Patch the RAGAgent.query_leads_tool once at session start.
-
-    This ensures tool-level I/O capture is active even if agent instances are
-    constructed in class-scoped fixtures before per-test fixtures run.
-    Printing respects env toggles RAG_DEBUG_IO and RAG_CAPTURE_TOOLS.
-    """
-    try:
-        from agent.operational_agents.rag_agent import rag_agent as rag_module
-        RAGAgent = getattr(rag_module, 'RAGAgent')
-    except Exception:
-        return
+        except Exception:  # pragma: no cover - defensive
+            pass
+        _flush_lines(out)
+        return result
 
-    if getattr(RAGAgent, '_rag_tools_patched_early', False):
-        return
+    setattr(RAGAgent, 'run', wrapped)
 
     original_tool = getattr(RAGAgent, 'query_leads_tool', None)
-    if original_tool is None:
-        return
-
-    def tool_wrapped(self, args):  # type: ignore
-        started = time.time()
-        filters = None
-        try:
-            if isinstance(args, dict) and isinstance(args.get('filters'), dict):
-                filters = dict(args.get('filters'))
-        except Exception:
+    if original_tool is not None:
+        def tool_wrapped(self, args):  # type: ignore
             filters = None
-        res = original_tool(self, args)
-        elapsed_ms = (time.time() - started) * 1000.0
-        try:
-            if isinstance(res, dict) and 'metadata' in res and 'records' in res:
-                total = res['metadata'].get('total_count')
+            try:
+                if isinstance(args, dict) and isinstance(args.get('filters'), dict):
+                    filters = dict(args.get('filters'))
+            except Exception:
+                filters = None
+            started = time.perf_counter_ns()
+            res = original_tool(self, args)
+            t_ms = round((time.perf_counter_ns() - started) / 1_000_000, 2)
+            try:
+                md = res['metadata']
+                records = res['records']
+            except (TypeError, KeyError):
+                return res
+            out: list[str] = []
+            try:
+                total = md.get('total_count')
                 status = 'success' if isinstance(total, int) and total > 0 else 'fail'
-                filters_meta = res['metadata'].get('query_filters') or filters
+                filters_meta = md.get('query_filters') or filters
                 ident_detail = _extract_ident(filters_meta)
-                records_preview = _preview_rows(res.get('records'), RAG_SUMMARY_RECORDS_N, RAG_SUMMARY_FULL_ROWS, RAG_SUMMARY_RECORD_FIELDS) if RAG_SUMMARY_INCLUDE_RECORDS else []
-                rec = {
-                    'test': _current_test.get(),
-                    't_ms': round(elapsed_ms, 2),
-                    'total_count': total,
-                    'filters': filters_meta,
-                    'kind': 'tool.query_leads',
-                    'status': status,
-                    'ident': ident_detail,
-                    'records_preview': records_preview,
-                }
+                records_preview = _preview_rows(records, RAG_SUMMARY_RECORDS_N, RAG_SUMMARY_FULL_ROWS, RAG_SUMMARY_RECORD_FIELDS) if RAG_SUMMARY_INCLUDE_RECORDS else []
+                rec = ToolRec(
+                    _current_test_nodeid, t_ms, total, filters_meta, 'tool.query_leads',
+                    status, ident_detail, records_preview,
+                )
                 _captured_tools.append(rec)
+                _latest_tools_by_test[rec.test] = rec
                 # Print only when tool capture requested and debug IO enabled
-                if os.environ.get('RAG_CAPTURE_TOOLS') in ('1','true','TRUE') and os.environ.get('RAG_DEBUG_IO') in ('1','true','TRUE'):
-                    print(_color('36', f"[RAG TOOL SEND] filters={filters}"))
-                    print(_color('32', f"[RAG TOOL RECV] count={rec['total_count']}"))
-                    if rec['total_count'] in (0, None):
-                        f2 = rec.get('filters') or filters or {}
-                        ident = None
-                        if isinstance(f2, dict):
-                            if 'id' in f2:
-                                ident = f"id={f2.get('id')}"
-                            elif 'email' in f2:
-                                ident = f"email={f2.get('email')}"
-                            elif 'company_name' in f2:
-                                ident = f"company={f2.get('company_name')}"
-                            elif 'company' in f2:
-                                ident = f"company={f2.get('company')}"
-                        detail = ident or (f"filters={f2}" if f2 else "no filters")
-                        print(_color('31', f"[IDENT FAIL] failed identification ({detail})"))
-                    else:
-                        # Success marker for tool path (early patch variant)
-                        f2 = rec.get('filters') or filters or {}
-                        ident = None
-                        if isinstance(f2, dict):
-                            if 'id' in f2:
-                                ident = f"id={f2.get('id')}"
-                            elif 'email' in f2:
-                                ident = f"email={f2.get('email')}"
-                            elif 'company_name' in f2:
-                                ident = f"company={f2.get('company_name')}"
-                            elif 'company' in f2:
-                                ident = f"company={f2.get('company')}"
-                        detail = ident or (f"filters={f2}" if f2 else "no filters")
-                        print(_color('32', f"[IDENT OK] identification succeeded ({detail}); rows={rec['total_count']}"))
-                    if os.environ.get('RAG_PRINT_RECORDS') in ('1','true','TRUE'):
+                if cfg.rag_capture_tools and cfg.rag_debug_io:
+                    out.append(_color('36', f"[RAG TOOL SEND] filters={filters}"))
+                    out.append(_color('32', f"[RAG TOOL RECV] count={rec.total_count}"))
+                    _emit_ident_status(out, total, filters_meta, ident_detail)
+                    if cfg.rag_print_records:
                         try:
-                            rows = res.get('records') or []
-                            n = int(os.environ.get('RAG_PRINT_RECORDS_N') or 3)
-                            full = os.environ.get('RAG_PRINT_RECORDS_FULL') in ('1','true','TRUE')
-                            fields = [f.strip() for f in (os.environ.get('RAG_RECORD_FIELDS') or 'email,company_name,id').split(',') if f.strip()]
-                            for i, row in enumerate(rows[:n]):
-                                if full:
-                                    try:
-                                        import json as _json
-                                        txt = _json.dumps(row, default=str)
-                                    except Exception:
-                                        txt = str(row)
-                                    if len(txt) > 8000:
-                                        txt = txt[:8000] + '...<truncated>'
-                                    print(_color('92', f"[RAG TOOL OUT FULL {i+1}] {txt}"))
-                                else:
-                                    pieces = []
-                                    for f in fields:
-                                        if f in row:
-                                            pieces.append(f"{f}={row.get(f)}")
-                                    print(_color('92', f"[RAG TOOL OUT {i+1}] " + (', '.join(pieces) if pieces else str(row)[:200])))
+                            _emit_records_preview(out, records, cfg.preview_n, cfg.rag_print_records_full, cfg.record_fields, 'RAG TOOL OUT')
                         except Exception:
                             pass
-        except Exception:  # pragma: no cover
-            pass
-        return res
+            except Exception:  # pragma: no cover
+                pass
+            _flush_lines(out)
+            return res
+
+        setattr(RAGAgent, 'query_leads_tool', tool_wrapped)
 
-    setattr(RAGAgent, 'query_leads_tool', tool_wrapped)
-    setattr(RAGAgent, '_rag_tools_patched_early', True)
-    # Also mark as patched for per-test logic to avoid double wrapping
-    setattr(RAGAgent, '_rag_tools_patched', True)
+# Keys that change on every run (timestamps, timings, provenance fetch time) and
+# are ignored when deciding whether the summary content actually changed.
+_SUMMARY_VOLATILE_KEYS = frozenset(('generated_at', 't_ms', 'retrieved_at'))
+
+def _summary_stable(obj):
+    if isinstance(obj, dict):
+        return {k: _summary_stable(v) for k, v in obj.items() if k not in _SUMMARY_VOLATILE_KEYS}
+    if isinstance(obj, list):
+        return [_summary_stable(v) for v in obj]
+    return obj
+
+def _summary_digest(payload: dict) -> str:
+    """BLAKE2b of the summary minus volatile keys, used to skip no-op rewrites."""
+    import json
+    canon = json.dumps(_summary_stable(payload), sort_keys=True, default=str).encode('utf-8')
+    return hashlib.blake2b(canon, digest_size=16).hexdigest()
 
 def pytest_sessionfinish(session, exitstatus):  # noqa
     if not _captured_runs and not _captured_tools:
         print(_color('31', '\n[RAG SUMMARY] No RAGAgent JSON runs or tool calls captured.'))
         return
-    # Aggregate last snapshot per test
-    latest_by_test = {}
-    for rec in _captured_runs:
-        latest_by_test[rec['test']] = rec
-    latest_tools_by_test = {}
-    for rec in _captured_tools:
-        latest_tools_by_test[rec['test']] = rec
+    latest_by_test = _latest_by_test
+    latest_tools_by_test = _latest_tools_by_test
     # Build textual lines
     print(_color('36', '\n[RAG SUMMARY] Final snapshot per test:'))
     for test, rec in sorted(latest_by_test.items()):
-        fb = _fmt_fallback(rec['fallback'])
-        trunc = _color('33', 'trunc') if rec['truncated'] else ''
-        summ = _color('35', 'summary') if rec['summary_present'] else ''
-        status = rec.get('status') or ('success' if (isinstance(rec.get('total_count'), int) and rec['total_count'] > 0) else 'fail')
-        status_col = _color('32', 'success') if status == 'success' else _color('31', 'fail')
-        print(f"{_color('37', '[RAG]')} {test} count={rec['total_count']} fb={fb} ms={rec['t_ms']} {trunc} {summ} status={status_col} ident={rec.get('ident')} filters={rec['filters']}")
+        fb = _fmt_fallback(rec.fallback)
+        trunc = _color('33', 'trunc') if rec.truncated else ''
+        summ = _color('35', 'summary') if rec.summary_present else ''
+        status_col = _color('32', 'success') if rec.status == 'success' else _color('31', 'fail')
+        print(f"{_color('37', '[RAG]')} {test} count={rec.total_count} fb={fb} ms={rec.t_ms} {trunc} {summ} status={status_col} ident={rec.ident} filters={rec.filters}")
     if latest_tools_by_test:
         print(_color('36', '\n[RAG SUMMARY] Final tool snapshot per test:'))
         for test, rec in sorted(latest_tools_by_test.items()):
-            status = rec.get('status') or ('success' if (isinstance(rec.get('total_count'), int) and rec['total_count'] > 0) else 'fail')
-            status_col = _color('32', 'success') if status == 'success' else _color('31', 'fail')
-            print(f"{_color('37', '[RAG TOOL]')} {test} count={rec['total_count']} ms={rec['t_ms']} status={status_col} ident={rec.get('ident')} filters={rec['filters']}")
+            status_col = _color('32', 'success') if rec.status == 'success' else _color('31', 'fail')
+            print(f"{_color('37', '[RAG TOOL]')} {test} count={rec.total_count} ms={rec.t_ms} status={status_col} ident={rec.ident} filters={rec.filters}")
     print(_color('36', f"[RAG SUMMARY] Total tests with captured runs: {len(latest_by_test)} (intermediate runs: {len(_captured_runs)})"))
     if latest_tools_by_test:
         print(_color('36', f"[RAG SUMMARY] Total tests with captured tools: {len(latest_tools_by_test)} (tool calls: {len(_captured_tools)})"))
 
     if not RAG_SUMMARY_DISABLE_FILE:
         try:
+            # Records become dicts only here, at serialization time
             payload = {
-                'tests_final': latest_by_test,
-                'all_runs': _captured_runs,
-                'tools_final': latest_tools_by_test,
-                'all_tools': _captured_tools,
+                'tests_final': {t: r._asdict() for t, r in latest_by_test.items()},
+                'all_runs': [r._asdict() for r in _captured_runs],
+                'tools_final': {t: r._asdict() for t, r in latest_tools_by_test.items()},
+                'all_tools': [r._asdict() for r in _captured_tools],
                 'generated_at': time.time(),
             }
-            with open(RAG_SUMMARY_JSON, 'w', encoding='utf-8') as f:
-                json.dump(payload, f, indent=2, default=str)
+            out_path = Path(RAG_SUMMARY_JSON)
+            digest = _summary_digest(payload)
+            try:
+                import json
+                unchanged = json.loads(out_path.read_bytes()).get('digest') == digest
+            except (OSError, ValueError, AttributeError):  # missing, unreadable or not a JSON object
+                unchanged = False
+            if unchanged and not RAG_SUMMARY_FORCE_WRITE:
+                print(_color('32', f"[RAG SUMMARY] JSON unchanged, kept {RAG_SUMMARY_JSON} (RAG_SUMMARY_FORCE_WRITE=1 to rewrite)"))
+                return
+            # stored in the file itself, so there is no sidecar artifact
+            payload['digest'] = digest
+            try:
+                import orjson  # type: ignore
+                data = orjson.dumps(payload, option=orjson.OPT_INDENT_2, default=str)
+            except Exception:  # orjson missing or unsupported value: stdlib fallback
+                import json
+                data = json.dumps(payload, indent=2, default=str).encode('utf-8')
+            # Write to a temp file next to the target and swap it in atomically
+            fd, tmp = tempfile.mkstemp(dir=out_path.resolve().parent, prefix='.rag_summary.', suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp, out_path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
             print(_color('32', f"[RAG SUMMARY] JSON written to {RAG_SUMMARY_JSON}"))
         except Exception as e:  # pragma: no cover
             print(_color('31', f"[RAG SUMMARY] Failed to write summary file: {e}"))
@@ -1,30 +1,27 @@
-import unittest
+import pytest
 
 from agent.utils.envelope import Envelope, make_envelope, validate_envelope
 
 
-class TestEnvelope(unittest.TestCase):
-    def test_from_records_and_validate(self):
-        records = [
-            {"id": "r1", "email": "a@example.com", "name": "Alice"},
-            {"id": "r2", "email": "b@example.com", "name": "Bob"},
-        ]
-        env = Envelope.from_records("supabase.leads", records, task_id="t1")
-        d = env.to_dict()
-        self.assertIn("metadata", d)
-        self.assertIn("records", d)
-        self.assertEqual(d["metadata"]["task_id"], "t1")
-        # validate_envelope should accept the produced dict
-        self.assertTrue(validate_envelope(d))
+@pytest.fixture(scope="module")
+def records():
+    # from_records copies each row, so one list serves every test
+    return [
+        {"id": "r1", "email": "a@example.com", "name": "Alice"},
+        {"id": "r2", "email": "b@example.com", "name": "Bob"},
+    ]
 
-    def test_include_raw(self):
-        records = [{"id": "r3", "foo": 1}]
-        env = Envelope.from_records("supabase.leads", records, task_id="t2", include_raw=True)
-        d = env.to_dict()
-        self.assertEqual(len(d["records"]), 1)
-        prov = d["records"][0].get("provenance", {})
-        self.assertIn("raw_row", prov)
 
-
-if __name__ == "__main__":
-    unittest.main()
+@pytest.mark.parametrize("include_raw", [False, True])
+def test_from_records_and_validate(records, include_raw):
+    env = Envelope.from_records("supabase.leads", records, task_id="t1", include_raw=include_raw)
+    d = env.to_dict()
+    assert "metadata" in d
+    assert "records" in d
+    assert d["metadata"]["task_id"] == "t1"
+    # validate_envelope should accept the produced dict
+    assert validate_envelope(d)
+    assert len(d["records"]) == len(records)
+    prov = d["records"][0].get("provenance", {})
+    # raw_row is embedded only when explicitly requested
+    assert ("raw_row" in prov) is include_raw
@@ -1,3 +1,7 @@
+import copy
+
+import pytest
+
 from agent.tools.persistence.adapters.in_memory_adapter import InMemoryAdapter
 from agent.tools.persistence.service import PersistenceService, ReadOnlyPersistenceFacade
 from agent.tools.persistence.exceptions import PersistencePermissionError, TableNotAllowedError
@@ -10,15 +14,37 @@ def build_service(allowed=None):
 	return PersistenceService(adapter, allowed_tables=allowed or {"leads", "messages"})
 
 
-def test_write_and_read_round_trip():
-	svc = build_service()
+@pytest.fixture(scope="module")
+def _svc_prototype():
+	return build_service()
+
+
+@pytest.fixture
+def svc(_svc_prototype):
+	"""Fresh {leads, messages} service: a deep copy of one module-wide prototype."""
+	return copy.deepcopy(_svc_prototype)
+
+
+@pytest.fixture
+def svc_factory():
+	"""Callable building a service for a custom allowlist (only when a test asks)."""
+	return build_service
+
+
+def test_write_and_read_round_trip(svc):
 	row = svc.write("leads", {"email": "a@example.com", "status": "new"})
 	fetched = svc.read("leads", row["id"])
 	assert fetched == row
 
 
-def test_query_with_filters_and_projection_and_order():
-	svc = build_service()
+def test_write_accepts_read_only_mapping(svc):
+	from types import MappingProxyType
+	row = svc.write("leads", MappingProxyType({"email": "ro@example.com", "status": None}))
+	assert row["email"] == "ro@example.com"
+	assert "status" not in row  # None values still dropped
+
+
+def test_query_with_filters_and_projection_and_order(svc):
 	svc.batch_write(
 		"messages",
 		[
@@ -39,8 +65,18 @@ def test_query_with_filters_and_projection_and_order():
 	assert set(rows[0].keys()) == {"body", "seq"}
 
 
-def test_upsert_on_conflict():
-	svc = build_service()
+def test_batch_write_assigns_ids_like_write(svc):
+	svc.write("leads", {"email": "first@example.com"})
+	rows = svc.batch_write(
+		"leads",
+		[{"email": "a@example.com"}, {"id": "keep-me", "email": "b@example.com"}, {"email": "c@example.com"}],
+	)
+	assert [r["id"] for r in rows] == ["2", "keep-me", "3"]
+	assert svc.write("leads", {"email": "d@example.com"})["id"] == "4"
+	assert len(svc.query("leads")) == 5
+
+
+def test_upsert_on_conflict(svc):
 	first = svc.upsert("leads", {"email": "dup@example.com", "status": "new"}, on_conflict=["email"])
 	second = svc.upsert(
 		"leads", {"email": "dup@example.com", "status": "qualified"}, on_conflict=["email"]
@@ -49,8 +85,8 @@ def test_upsert_on_conflict():
 	assert second["status"] == "qualified"
 
 
-def test_disallowed_table_raises():
-	svc = build_service(allowed={"leads"})
+def test_disallowed_table_raises(svc_factory):
+	svc = svc_factory(allowed={"leads"})
 	try:
 		svc.write("messages", {"body": "x"})
 	except TableNotAllowedError:
@@ -59,8 +95,8 @@ def test_disallowed_table_raises():
 		raise AssertionError("Expected PermissionError for disallowed table")
 
 
-def test_read_only_facade_blocks_writes_and_allows_reads():
-	svc = build_service(allowed={"leads"})
+def test_read_only_facade_blocks_writes_and_allows_reads(svc_factory):
+	svc = svc_factory(allowed={"leads"})
 	row = svc.write("leads", {"email": "ro@example.com"})
 	ro = ReadOnlyPersistenceFacade(svc)
 	# read works
@@ -1,17 +1,41 @@
 import time
+
 from agent.Infastructure.queue.in_memory import InMemoryQueue
 
 
 def test_enqueue_dequeue_ack():
-    q = InMemoryQueue(visibility_timeout=0.2, requeue_check_interval=0.05)
+    q = InMemoryQueue(visibility_timeout=0.05, requeue_check_interval=0.01)
     job = {"run_id": "r1", "orchestrator": "lead", "payload": {"a": 1}}
     jid = q.enqueue("orchestrate", job)
     assert jid
     item = q.dequeue("orchestrate", timeout=0.5)
     assert item["job_id"] == jid
     q.ack(jid)
-    # after ack, should not requeue
-    time.sleep(0.3)
-    none = q.dequeue("orchestrate", timeout=0.1)
+    # after ack, should not requeue: run a requeue pass as if the visibility
+    # timeout had long passed instead of sleeping through it
+    assert q.run_requeue_once(now=time.time() + 1.0) == 0
+    none = q.dequeue("orchestrate", timeout=0)
     assert none is None
     q.stop()
+
+
+def test_unacked_job_requeued_after_visibility_timeout():
+    # Long real timeout so only the explicit pass (with a future `now`) requeues
+    q = InMemoryQueue(visibility_timeout=30.0, requeue_check_interval=0.01)
+    jid = q.enqueue("orchestrate", {"run_id": "r2"})
+    assert q.dequeue("orchestrate", timeout=0.5)["job_id"] == jid
+    assert q.run_requeue_once(now=time.time() + 60.0) == 1
+    again = q.dequeue("orchestrate", timeout=0)
+    assert again["job_id"] == jid
+    q.stop()
+
+
+def test_on_demand_requeue_without_background_thread():
+    # requeue_check_interval=None: expired leases are swept inside dequeue
+    q = InMemoryQueue(visibility_timeout=0.05, requeue_check_interval=None)
+    jid = q.enqueue("orchestrate", {"run_id": "r3"})
+    assert q.dequeue("orchestrate", timeout=0.5)["job_id"] == jid
+    # the blocked dequeue wakes when the lease expires and picks the job up again
+    again = q.dequeue("orchestrate", timeout=1.0)
+    assert again["job_id"] == jid
+    q.stop()
@@ -1,31 +1,25 @@
+import copy
+
 import pytest
-from agent.operational_agents.factory import create_persistence_agent
-from agent.tools.persistence.service import ReadOnlyPersistenceFacade
+from agent.tools.persistence.service import PersistenceService, ReadOnlyPersistenceFacade
 from agent.operational_agents.rag_agent.rag_agent import RAGAgent
 from agent.config.persistence_config import get_read_allowlist
 
 
 @pytest.fixture(scope="module")
-def shared_service_and_facade():
-    # extend write allowlist for test seeding; read facade can include same plus additions
+def shared_service_and_facade(seeded_adapter_prototype):
+    # extend write allowlist over the seeded tables; read facade can include same plus additions
     write_allow = ['leads', 'staging_leads', 'conversations', 'messages', 'inquiries', 'campaigns', 'clients']
-    p = create_persistence_agent(kind='memory', allowed_tables=write_allow)
-    svc = p.service
-    # seed tables
-    svc.write('leads', {'email': 'alice@example.com', 'company_name': 'Acme', 'client_id': 'c1'})
-    svc.write('leads', {'email': 'bob@example.org', 'company_name': 'BetaCorp', 'client_id': 'c1'})
-    svc.write('staging_leads', {'email': 'staging@example.com'})
-    svc.write('conversations', {'topic': 'welcome sequence', 'client_id': 'c1'})
-    svc.write('messages', {'conversation_id': '1', 'direction': 'outbound', 'body': 'Hello Alice'})
-    svc.write('inquiries', {'email': 'alice@example.com', 'status': 'open'})
-    svc.write('campaigns', {'name': 'Fall Outreach', 'status': 'active'})
-    svc.write('clients', {'name': 'Acme', 'tier': 'gold'})
+    # private copy of the session-wide seed (see conftest._SEED_ROWS)
+    adapter = copy.deepcopy(seeded_adapter_prototype)
+    svc = PersistenceService(adapter, read_allowlist=get_read_allowlist(), write_allowlist=write_allow)
     facade = ReadOnlyPersistenceFacade(svc)
     return svc, facade
 
 
-@pytest.fixture()
+@pytest.fixture(scope="module")
 def rag(shared_service_and_facade):
+    # Tests only read through the facade, so one agent serves the whole module
     _, facade = shared_service_and_facade
     return RAGAgent(read_only_persistence=facade)
 
@@ -45,34 +39,44 @@ def test_query_leads_company_filter(rag):
 
 def test_query_leads_domain_wildcard(rag):
     # In-memory adapter only supports equality; test exact secondary email
-    tool = next(t for t in rag.tools if t.name == 'query_leads')
+    tool = rag.get_tool('query_leads')
     res = tool.func({'filters': {'email': 'bob@example.org'}})
     assert res['metadata']['total_count'] == 1
     assert res['records'][0]['email'] == 'bob@example.org'
 
 
 def test_generic_query_each_table(rag):
-    # Enumerate read allowlist and query first few tables generically
+    # Enumerate read allowlist and query every table in one batch call
     allowlist = get_read_allowlist()
+    result = rag.get_tool('query_tables').func({'tables': list(allowlist)})
+    assert 'metadata' in result
     exercised = {}
-    for table in allowlist:
-        # use generic query tool if available
-        tool = next((t for t in rag.tools if t.name == 'query_table'), None)
-        if tool is None:
-            pytest.skip('query_table tool not registered (facade missing)')
-        result = tool.func({'table': table})
-        assert 'metadata' in result
-        assert result['metadata']['source'].startswith('persistence.')
+    for table, env in result['tables'].items():
+        assert env['metadata']['source'].startswith('persistence.')
         # we only require that the tool runs; rows may be zero for some seeded sets
-        assert 'records' in result
-        exercised[table] = result['metadata']['total_count']
+        assert 'records' in env
+        exercised[table] = env['metadata']['total_count']
+    assert set(exercised) == {t.lower() for t in allowlist}
     # Ensure at least leads was exercised with >0 results
     assert exercised.get('leads', 0) > 0
 
 
+def test_query_tables_filter_keys_match_case_insensitively(rag):
+    tool = rag.get_tool('query_tables')
+    res = tool.func({'tables': ['Leads'], 'filters': {'Leads': {'company_name': 'Acme'}}})
+    assert res['tables']['leads']['metadata']['total_count'] == 1
+    assert res['tables']['leads']['records'][0]['company_name'] == 'Acme'
+
+
+def test_query_tables_skips_non_string_entries(rag):
+    tool = rag.get_tool('query_tables')
+    res = tool.func({'tables': ['leads', 5]})
+    assert res['metadata']['tables'] == ['leads']
+    assert res['metadata']['skipped'] == [5]
+
+
 def test_query_table_with_filters(rag):
-    tool = next((t for t in rag.tools if t.name == 'query_table'), None)
-    assert tool is not None
+    tool = rag.get_tool('query_table')
     res = tool.func({'table': 'clients', 'filters': {'name': 'Acme'}})
     assert res['metadata']['total_count'] == 1
     assert res['records'][0]['name'] == 'Acme'
@@ -85,9 +89,7 @@ def test_rag_agent_no_write_capability(rag):
 
 
 def test_query_invalid_table(rag):
-    tool = next((t for t in rag.tools if t.name == 'query_table'), None)
-    if tool is None:
-        pytest.skip('query_table tool not available')
+    tool = rag.get_tool('query_table')
     res = tool.func({'table': 'nonexistent_table_xyz'})
     # Should return error metadata and zero records rather than raising directly
     assert res['metadata']['total_count'] == 0
@@ -104,3 +106,10 @@ def test_fallback_on_empty(rag):
     assert env['metadata']['total_count'] == 0
     # Ensure a response record exists from agent reasoning
     assert any('response' in r for r in env['records'])
+
+
+def test_parse_filters_cached_returns_fresh_dicts(rag):
+    first = rag.parse_filters_from_text('find leads with alice@example.com')
+    first['email'] = 'mutated'
+    second = rag.parse_filters_from_text('find leads with alice@example.com')
+    assert second == {'email': 'alice@example.com'}
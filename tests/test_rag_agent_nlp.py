@@ -57,9 +57,8 @@ def _assert_envelope_shape(env):
 
 
 def test_nlp_company_query(seeded_agents):
-    rag = seeded_agents["rag"]
     # Directly invoke the leads tool for deterministic behavior (bypasses LLM tool choice).
-    tool = next(t for t in rag.tools if t.name == 'query_leads')
+    tool = seeded_agents["rag"].get_tool('query_leads')
     env = tool.func({'company': 'Acme'})
     _assert_envelope_shape(env)
     assert env["metadata"]["total_count"] >= 1
@@ -67,9 +66,8 @@ def test_nlp_company_query(seeded_agents):
 
 
 def test_nlp_email_query(seeded_agents):
-    rag = seeded_agents["rag"]
     email = seeded_agents["alice_email"]
-    tool = next(t for t in rag.tools if t.name == 'query_leads')
+    tool = seeded_agents["rag"].get_tool('query_leads')
     env = tool.func({'email': email})
     _assert_envelope_shape(env)
     assert env["metadata"]["total_count"] >= 1
@@ -77,9 +75,8 @@ def test_nlp_email_query(seeded_agents):
 
 
 def test_nlp_id_query(seeded_agents):
-    rag = seeded_agents["rag"]
     lead_id = seeded_agents["acme_id"]
-    tool = next(t for t in rag.tools if t.name == 'query_leads')
+    tool = seeded_agents["rag"].get_tool('query_leads')
     env = tool.func({'id': lead_id})
     _assert_envelope_shape(env)
     assert env["metadata"]["total_count"] >= 1
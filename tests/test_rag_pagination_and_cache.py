@@ -10,12 +10,14 @@ def rag_many():
     p = create_persistence_agent(kind='memory', allowed_tables=write_allow)
     svc = p.service
     # seed 120 leads to exercise pagination + summary threshold (default SUMMARY_THRESHOLD=200 -> may not trigger summary here)
-    for i in range(120):
-        svc.write('leads', {
+    svc.batch_write('leads', [
+        {
             'email': f'user{i}@example.com',
             'company_name': 'Acme' if i % 2 == 0 else 'Beta',
             'client_id': 'c1'
-        })
+        }
+        for i in range(120)
+    ])
     facade = ReadOnlyPersistenceFacade(svc)
     return RAGAgent(read_only_persistence=facade)
 
@@ -37,11 +39,9 @@ def test_explicit_limit_and_offset(rag_many):
 
 
 def test_cache_hit(rag_many):
-    env1 = rag_many.run('find leads at Acme', return_json=True, limit=10)
-    env2 = rag_many.run('find leads at Acme', return_json=True, limit=10)
-    # cache metadata only exists on tool path; run() fast path returns similar but we didn't embed cache flag
-    # So instead directly invoke query_leads_tool to inspect cache behavior
-    tool = next(t for t in rag_many.tools if t.name == 'query_leads')
+    # cache metadata only exists on the tool path (run() queries the facade
+    # directly), so invoke query_leads_tool to inspect cache behavior
+    tool = rag_many.get_tool('query_leads')
     res1 = tool.func({'filters': {'company': 'Acme'}, 'limit': 15})
     res2 = tool.func({'filters': {'company': 'Acme'}, 'limit': 15})
     assert res1['metadata']['cache'] in ('hit', 'miss')
@@ -50,7 +50,7 @@ def test_cache_hit(rag_many):
 
 def test_limit_cap(rag_many):
     # Request an excessively large limit to ensure it is capped
-    tool = next(t for t in rag_many.tools if t.name == 'query_leads')
+    tool = rag_many.get_tool('query_leads')
     res = tool.func({'filters': {'company': 'Acme'}, 'limit': 999999})
     assert res['metadata']['limit'] <= 500  # capped by MAX_PAGE_LIMIT
 
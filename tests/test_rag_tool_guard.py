@@ -18,7 +18,7 @@ class TestRagToolGuard(unittest.TestCase):
 
         # Call rag_tool with an envelope (as dict)
         out = agent.rag_tool(envelope)
-        self.assertEqual(out.get('records'), sample_records)
+        self.assertIs(out, envelope)  # returned untouched, no re-serialization
 
         # Call rag_tool with JSON string
         out2 = agent.rag_tool(json.dumps(envelope))
@@ -2,22 +2,17 @@ from agent.high_level_agents.orchestrators.reply_orchestrator import ReplyOrches
 from agent.operational_agents.copywriter.copywriter import CopywriterAgent
 
 
-def test_reply_orchestrator_generates_email():
+def test_reply_orchestrator_generates_email(assert_envelope):
     reg = {"copywriter": CopywriterAgent()}
     orch = ReplyOrchestrator(registry=reg)
     payload = {"channel": "email", "context": {"name": "Sam", "company": "Acme", "action": "confirm"}}
     env = orch.run(payload)
-    assert "metadata" in env and "records" in env
-    rec = env["records"][0]
-    assert rec["channel"] == "email"
-    assert "subject" in rec["content"] and "body" in rec["content"]
+    assert_envelope(env, channel="email", has_subject=True, has_body=True)
 
 
-def test_reply_orchestrator_generates_text():
+def test_reply_orchestrator_generates_text(assert_envelope):
     reg = {"copywriter": CopywriterAgent()}
     orch = ReplyOrchestrator(registry=reg)
     payload = {"channel": "text", "context": {"name": "Sam", "action": "verify"}}
     env = orch.run(payload)
-    rec = env["records"][0]
-    assert rec["channel"] == "text"
-    assert isinstance(rec["content"], str)
+    assert_envelope(env, channel="text", text=True)
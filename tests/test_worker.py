@@ -1,23 +1,21 @@
-from unittest.mock import MagicMock
-from agent.Infastructure.queue.in_memory import InMemoryQueue
+from types import SimpleNamespace
 from agent.Infastructure.worker.worker import Worker
 
 
-def test_worker_runs_orchestrator(monkeypatch):
-    q = InMemoryQueue(visibility_timeout=1.0, requeue_check_interval=0.1)
+def test_worker_runs_orchestrator(queue):
+    q = queue
     # fake orchestrator class
     class FakeOrch:
         def run(self, payload):
             return {"metadata": {}, "records": [payload]}
 
-    registry = MagicMock()
-    registry.get.return_value = FakeOrch
+    # Worker only calls registry.get(name); a plain namespace avoids Mock bookkeeping
+    registry = SimpleNamespace(get=lambda name: FakeOrch)
 
     worker = Worker(q, registry)
     job = {"run_id": "r1", "orchestrator": "fake", "payload": {"x": 1}}
     jid = q.enqueue("orchestrate", job)
-    worker.run_once(timeout=0.5)
+    assert worker.run_once(timeout=0.05)
     # after successful run, job should be acked and not reappear
-    item = q.dequeue("orchestrate", timeout=0.1)
+    item = q.dequeue("orchestrate", timeout=0.01)
     assert item is None
-    q.stop()